@@ -0,0 +1,78 @@
+"""Compare the chunked migration checksum with the line-by-line one of earlier releases.
+
+Generates seed files of millions of short lines and of one enormous INSERT, then times both,
+and every checksum algorithm whose module is installed:
+
+    python benchmarks/bench_checksum.py --megabytes 1024
+"""
+import argparse
+import os
+import tempfile
+import time
+import zlib
+from typing import Callable, Iterator
+
+from pyway.hashing import ALGORITHMS
+from pyway.helpers import Utils
+
+
+def short_lines(megabytes: int) -> Iterator[bytes]:
+    block = b"".join(b"INSERT INTO t VALUES (%d);\n" % i for i in range(40000))
+    for _ in range(megabytes * 1024 * 1024 // len(block) + 1):
+        yield block
+
+
+def single_insert(megabytes: int) -> Iterator[bytes]:
+    yield b"INSERT INTO t VALUES "
+    block = b",".join(b"(%d, 'seed')" % i for i in range(40000)) + b","
+    for _ in range(megabytes * 1024 * 1024 // len(block) + 1):
+        yield block
+    yield b"(0, 'seed');\n"
+
+
+def line_by_line(name: str, path: str) -> str:
+    prev = 0
+    with open(os.path.join(path, name), "rb") as file:
+        for line in file:
+            prev = zlib.crc32(line, prev)
+    return "%X" % (prev & 0xFFFFFFFF)
+
+
+def timed(function: Callable[[str, str], str], name: str, path: str) -> tuple:
+    start = time.perf_counter()
+    checksum = function(name, path)
+    return checksum, time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--megabytes", type=int, default=1024, help="Size of each generated seed file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as path:
+        for shape, generate in (("short lines", short_lines), ("single INSERT", single_insert)):
+            name = "V01_01__seed.sql"
+            with open(os.path.join(path, name), "wb") as file:
+                for block in generate(args.megabytes):
+                    file.write(block)
+            size = os.path.getsize(os.path.join(path, name)) / (1024 * 1024)
+
+            old, old_time = timed(line_by_line, name, path)
+            new, new_time = timed(Utils.load_checksum_from_name, name, path)
+            assert old == new, f"checksum mismatch {old} != {new}"
+            print(f"{shape:>14} ({size:.0f} MiB): line by line {old_time:.2f}s ({size / old_time:.0f} MiB/s), "
+                  f"chunked {new_time:.2f}s ({size / new_time:.0f} MiB/s), checksum {new}")
+
+            for algorithm in ALGORITHMS:
+                try:
+                    start = time.perf_counter()
+                    checksum = Utils.load_checksum_from_name(name, path, algorithm)
+                except ImportError:
+                    print(f"{algorithm:>14}: not installed")
+                    continue
+                elapsed = time.perf_counter() - start
+                print(f"{algorithm:>14}: {elapsed:.2f}s ({size / elapsed:.0f} MiB/s), checksum {checksum}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Time a multi-megabyte migration script through each MySQL driver backend.
+
+Connection settings come from the usual PYWAY_DATABASE_* environment variables:
+
+    PYWAY_DATABASE_HOST=127.0.0.1 PYWAY_DATABASE_NAME=bench PYWAY_DATABASE_USERNAME=root \
+        python benchmarks/bench_mysql_drivers.py --megabytes 8
+"""
+import argparse
+import time
+
+from pyway.configfile import ConfigFile
+from pyway.dbms.mysql import DRIVERS, Mysql, resolve_driver
+
+TABLE = "pyway_driver_bench"
+ROWS_PER_INSERT = 500
+
+
+def build_script(megabytes: int) -> str:
+    """Seed-style script of multi-row inserts, roughly the requested size"""
+    row = "(%d, 'some seed data that is about as wide as a typical lookup row')"
+    statements = [f"drop table if exists {TABLE};",
+                  f"create table {TABLE} (id int primary key, label varchar(100));"]
+    size, n = 0, 0
+    while size < megabytes * 1024 * 1024:
+        values = ",".join(row % (n + i) for i in range(ROWS_PER_INSERT))
+        statement = f"insert into {TABLE} values {values};"
+        statements.append(statement)
+        size += len(statement)
+        n += ROWS_PER_INSERT
+    statements.append(f"drop table {TABLE};")
+    return "\n".join(statements)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--megabytes", type=int, default=8, help="Approximate script size")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per driver, the best one is reported")
+    parser.add_argument("--drivers", default=",".join(DRIVERS), help="Comma separated drivers to compare")
+    args = parser.parse_args()
+
+    script = build_script(args.megabytes)
+    size = len(script) / (1024 * 1024)
+    print(f"script: {size:.1f} MiB, {script.count(';')} statements")
+
+    for name in args.drivers.split(","):
+        config = ConfigFile(database_table="pyway", database_driver=name)
+        try:
+            db = Mysql(config)
+        except ImportError as error:
+            print(f"{name:>12}: unavailable ({error})")
+            continue
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            db.execute(script)
+            timings.append(time.perf_counter() - start)
+        best = min(timings)
+        used = resolve_driver(name)
+        note = f" (fell back to {used})" if used != name else ""
+        print(f"{name:>12}: {best:.2f}s, {size / best:.1f} MiB/s{note}")
+        db.disconnect()
+
+
+if __name__ == "__main__":
+    main()
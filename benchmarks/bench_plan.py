@@ -0,0 +1,34 @@
+"""Time planning over a large migration history: parsing names, sorting, and finding pending files.
+
+Builds the migrations in memory, so no directory or database is needed:
+
+    python benchmarks/bench_plan.py --migrations 50000
+"""
+import argparse
+import time
+
+from pyway.helpers import Utils
+from pyway.migration import Migration
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--migrations", type=int, default=50000, help="Number of migration files")
+    args = parser.parse_args()
+
+    names = [f"V{i // 1000}_{i % 1000}_{i % 7}__step_{i}.sql" for i in range(args.migrations, 0, -1)]
+
+    start = time.perf_counter()
+    local = Utils.sort_migrations_list([Migration.from_name(name, "") for name in names])
+    parsed = time.perf_counter()
+    # The history has every migration except the last tenth
+    history = [Migration(m.version, m.extension, m.name, "0", None) for m in local[:len(local) * 9 // 10]]
+    pending = Utils.subtract(local, history)
+    done = time.perf_counter()
+
+    print(f"{len(names)} names: parse and sort {parsed - start:.3f}s, "
+          f"subtract {done - parsed:.3f}s ({len(pending)} pending)")
+
+
+if __name__ == "__main__":
+    main()
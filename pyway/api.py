@@ -0,0 +1,48 @@
+"""Run pyway commands from inside an application.
+
+Each function takes the usual ConfigFile and an optional connection owned by the
+application: a DB-API connection, a pool (including a SQLAlchemy engine) or a
+callable returning a connection. Host and credentials can then be left out of the
+config. Borrowed connections are handed back when the command finishes, never closed.
+
+    engine = sqlalchemy.create_engine(url)
+    config = ConfigFile(database_type="postgres", database_table="public.pyway",
+                        database_migration_dir="migrations")
+    api.migrate(config, engine)
+"""
+import asyncio
+from concurrent.futures import Executor
+from typing import Any, Optional
+
+from pyway.configfile import ConfigFile
+from pyway.dbms.database import session
+from pyway.info import Info
+from pyway.migrate import Migrate
+from pyway.validate import Validate
+
+
+def info(config: ConfigFile, connection: Any = None) -> str:
+    with session(config, connection) as db:
+        return Info(config, db).run()
+
+
+def validate(config: ConfigFile, connection: Any = None, skip_initial_check: bool = False) -> str:
+    with session(config, connection) as db:
+        return Validate(config, db).run(skip_initial_check=skip_initial_check)
+
+
+def migrate(config: ConfigFile, connection: Any = None) -> str:
+    """Validate the applied migrations, then apply the pending ones, like `pyway migrate`"""
+    with session(config, connection) as db:
+        migrator = Migrate(config, db)
+        Validate(config, plan=migrator.plan).run(skip_initial_check=True)
+        return migrator.run()
+
+
+async def migrate_async(config: ConfigFile, connection: Any = None, executor: Optional[Executor] = None) -> str:
+    """Async version of migrate(), blocking calls run on executor"""
+    with session(config, connection) as db:
+        migrator = Migrate(config, db, executor=executor)
+        validator = Validate(config, plan=migrator.plan)
+        await asyncio.get_running_loop().run_in_executor(executor, validator.run, True)
+        return await migrator.run_async()
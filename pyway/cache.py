@@ -0,0 +1,87 @@
+import json
+import os
+import time
+from typing import Dict, List, Optional
+
+from pyway.hashing import DEFAULT_ALGORITHM, algorithm_of
+from pyway.helpers import LocalFile, Utils
+from pyway.log import logger
+
+CACHE_FILE = ".pyway-cache"
+CACHE_FORMAT = 1
+# Files modified this recently may change again within the same mtime tick, so they are not cached
+RACY_WINDOW_NS = 2 * 1000 * 1000 * 1000
+
+
+class ChecksumCache():
+    """Checksums of migration files keyed on their identity, kept in .pyway-cache in the migration directory.
+
+    An entry is used only while the file's size, mtime_ns and inode are unchanged and only for
+    the algorithm its checksum was computed with, so a hit costs one stat() and no read. The
+    hidden file is skipped by the migration directory scan. It is rewritten through a temporary
+    file and os.replace(), so concurrent runs see either the old or the new cache, never a
+    partial one. A cache that can't be read is ignored.
+    """
+
+    def __init__(self, migration_dir: str) -> None:
+        self.directory = Utils.basepath(migration_dir)
+        self.path = os.path.join(self.directory, CACHE_FILE)
+        self._entries: Dict[str, List] = self._load()
+        self._dirty = False
+        self.hits = 0
+        self.misses = 0
+
+    def _load(self) -> Dict[str, List]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as cache_file:
+                content = json.load(cache_file)
+            if content.get("format") == CACHE_FORMAT:
+                return dict(content["entries"])
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            pass
+        return {}
+
+    def checksum(self, name: str, algorithm: str = DEFAULT_ALGORITHM, local_file: Optional[LocalFile] = None) -> str:
+        """Checksum of a file, local_file reuses the stat data of the directory scan"""
+        if local_file is None:
+            stat = os.stat(os.path.join(self.directory, name))
+            identity = [stat.st_size, stat.st_mtime_ns, stat.st_ino]
+        else:
+            identity = [local_file.size, local_file.mtime_ns, local_file.inode]
+
+        entry = self._entries.get(name)
+        if entry is not None and entry[:3] == identity and self._algorithm_of(entry) == algorithm:
+            self.hits += 1
+            return entry[3]
+
+        self.misses += 1
+        checksum = Utils.load_checksum_from_name(name, self.directory, algorithm)
+        if time.time_ns() - identity[1] > RACY_WINDOW_NS:
+            self._entries[name] = identity + [checksum]
+        else:
+            self._entries.pop(name, None)
+        self._dirty = True
+        return checksum
+
+    @staticmethod
+    def _algorithm_of(entry: List) -> Optional[str]:
+        try:
+            return algorithm_of(entry[3])
+        except (RuntimeError, IndexError, AttributeError):
+            return None
+
+    def save(self) -> None:
+        """Write the cache if anything changed, dropping files that are gone"""
+        if not self._dirty:
+            return
+        try:
+            # Only files that are gone are dropped, not the ones this run had no reason to look up
+            existing = set(os.listdir(self.directory))
+            entries = {name: entry for name, entry in self._entries.items() if name in existing}
+            # Readable by every user sharing the directory, see Utils.replace_file()
+            Utils.replace_file(self.path, json.dumps({"format": CACHE_FORMAT, "entries": entries}))
+        except OSError as error:
+            # The cache only saves work, a read-only checkout still runs
+            logger.debug(f"Checksum cache not written: {error}")
+            return
+        self._dirty = False
@@ -0,0 +1,86 @@
+import heapq
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+from pyway.cache import ChecksumCache
+from pyway.errors import DUPLICATE_VERSION_ERROR
+from pyway.hashing import DEFAULT_ALGORITHM
+from pyway.helpers import Utils
+from pyway.manifest import indexed_migration, load_manifest
+from pyway.migration import Migration
+from pyway.sources import MigrationSources
+
+
+def load_local_migrations(migration_dir: str, algorithm: str = DEFAULT_ALGORITHM) -> List[Migration]:
+    """Migrations for every file in migration_dir, sorted by version. Checksums are read on first use"""
+    return load_migrations(MigrationSources([migration_dir]), algorithm)
+
+
+def load_migrations(sources: MigrationSources, algorithm: str = DEFAULT_ALGORITHM) -> List[Migration]:
+    """Migrations of every location, merged and sorted by version. Checksums are read on first use
+
+    When `pyway index` wrote a manifest for a single flat directory, files whose size and mtime
+    still match their entry take version and checksum from it, as long as the checksum was
+    computed with algorithm. Any other file is parsed and read as usual.
+    """
+    manifest = load_manifest(sources.locations[0]) if sources.flat else {}
+    streams = []
+    for local_files in sources.scan():
+        migrations = []
+        for local_file in local_files:
+            entry = manifest.get(local_file.name)
+            migration = indexed_migration(entry, local_file, local_file.directory) if entry else None
+            if migration is not None:
+                # A manifest checksum of another algorithm is dropped and the file read on first use
+                migration.algorithm = algorithm
+            else:
+                migration = Migration.from_name(local_file.name, local_file.directory, algorithm, local_file)
+            migrations.append(migration)
+        streams.append(Utils.sort_migrations_list(migrations))
+    return merge_migrations(streams)
+
+
+def merge_migrations(streams: List[List[Migration]]) -> List[Migration]:
+    """Merge lists sorted by version into one, a version found twice is an error"""
+    merged: List[Migration] = []
+    for migration in heapq.merge(*streams, key=lambda m: (m.version_key, m.name)):
+        if merged and merged[-1].version_key == migration.version_key:
+            previous = merged[-1]
+            raise RuntimeError(DUPLICATE_VERSION_ERROR % (migration.version,
+                                                          os.path.join(previous.path or '', previous.name),
+                                                          os.path.join(migration.path or '', migration.name)))
+        merged.append(migration)
+    return merged
+
+
+def local_file_names(sources: MigrationSources) -> List[str]:
+    """Names of the files of every location"""
+    return [local_file.name for local_files in sources.scan() for local_file in local_files]
+
+
+def load_checksums(migrations: List[Migration], workers: Optional[int] = None,
+                   cache: Optional[ChecksumCache] = None) -> None:
+    """Checksum migrations whose checksum isn't known yet, ahead of comparing them.
+
+    Files are read and checksummed on up to workers threads (the ThreadPoolExecutor default
+    when None), zlib and hashlib release the GIL while hashing. workers=1 reads them one at a time.
+    With a cache, unchanged files are not read at all and the cache is saved afterwards.
+    """
+    def load(migration: Migration) -> None:
+        if cache is not None:
+            migration.checksum = cache.checksum(migration.name, migration.algorithm, migration.local_file)
+        else:
+            # Reading the property computes and keeps the checksum
+            migration.checksum = migration.checksum
+
+    pending = [migration for migration in migrations if not migration.has_checksum]
+    if workers == 1 or len(pending) < 2:
+        for migration in pending:
+            load(migration)
+    else:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pyway-checksum") as executor:
+            # Consuming the results raises the first error in input order
+            list(executor.map(load, pending))
+    if cache is not None:
+        cache.save()
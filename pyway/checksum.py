@@ -1,36 +1,65 @@
 import os
-from typing import Tuple
+from typing import Any, List, Tuple
 
+from pyway.hashing import algorithm_of, get_algorithm
 from pyway.helpers import Utils
 from pyway.migration import Migration
 from pyway.dbms.database import factory
 from pyway.configfile import ConfigFile
+from pyway.plan import Plan
+from pyway.sources import MigrationSources
+from pyway.validate import Validate
 
 
 class Checksum():
-    def __init__(self, args: ConfigFile) -> None:
-        self._db = factory(args.database_type)(args)
+    def __init__(self, args: ConfigFile, db: Any = None) -> None:
+        self._db = db if db is not None else factory(args.database_type)(args)
         self.migration_dir = args.database_migration_dir
         self.checksum_file = args.checksum_file
+        self.algorithm = get_algorithm(args.checksum_algorithm).name
         self.args = args
 
     def run(self) -> Tuple[str, str]:
         if not self.checksum_file:
             raise AttributeError("Error, must specify --checksum-file with checksum")
 
-        # If a path is specified, strip that off - all files should
-        # be in the migration_dir directory
+        # If a path is specified, strip that off - files are looked
+        # up by name in the migration directories
         if os.path.isabs(self.checksum_file) or os.sep in self.checksum_file:
             self.checksum_file = os.path.basename(self.checksum_file)
 
-        if not os.path.exists(os.path.join(os.getcwd(), self.migration_dir, self.checksum_file)):
+        directory = MigrationSources.from_config(self.args).find(self.checksum_file)
+        if directory is None:
             raise FileNotFoundError(f"Error, schema file '{self.migration_dir}/{self.checksum_file}' does not exist!")
 
         # Generate new checksum
         version: str = Utils.get_version_from_name(self.checksum_file)
         migration: Migration = self._db.get_schema_migration(version)
-        migration.checksum = Utils.load_checksum_from_name(self.checksum_file, self.migration_dir)
+        migration.checksum = Utils.load_checksum_from_name(self.checksum_file, directory, self.algorithm)
 
         self._db.update_checksum(migration)
 
         return self.checksum_file, migration.checksum
+
+    def run_all(self) -> List[Tuple[str, str]]:
+        """Move every applied migration to the configured algorithm, returning the rows updated
+
+        Each file is validated against its current checksum first, so a file edited since
+        it was applied fails here instead of getting its new content recorded.
+        """
+        plan = Plan(self.args, self._db)
+        Validate(self.args, plan=plan).run(skip_initial_check=True)
+
+        local_migrations = {m.version_key: m for m in plan.local_migrations}
+        outdated = [m for m in plan.db_migrations if algorithm_of(m.checksum) != self.algorithm]
+        pairs = [(m, local_migrations[m.version_key]) for m in outdated]
+        for _, local_migration in pairs:
+            local_migration.algorithm = self.algorithm
+        plan.load_checksums([local_migration for _, local_migration in pairs])
+
+        updated = []
+        for db_migration, local_migration in pairs:
+            db_migration.checksum = local_migration.checksum
+            self._db.update_checksum(db_migration)
+            updated.append((db_migration.name, db_migration.checksum))
+        return updated
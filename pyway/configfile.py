@@ -1,11 +1,18 @@
 import os
 import sys
-from typing import Any, Union
+from contextlib import contextmanager
+from typing import Any, Iterator, Union
 
 
 class ConfigFile():
     def __init__(self, **kwargs: Any) -> None:
         self.database_migration_dir = os.environ.get('PYWAY_DATABASE_MIGRATION_DIR', kwargs.get('database_migration_dir'))
+        self.database_migration_recursive = os.environ.get('PYWAY_DATABASE_MIGRATION_RECURSIVE',
+                                                           kwargs.get('database_migration_recursive'))
+        self.database_migration_include = os.environ.get('PYWAY_DATABASE_MIGRATION_INCLUDE',
+                                                         kwargs.get('database_migration_include'))
+        self.database_migration_exclude = os.environ.get('PYWAY_DATABASE_MIGRATION_EXCLUDE',
+                                                         kwargs.get('database_migration_exclude'))
         self.database_table = os.environ.get('PYWAY_TABLE', kwargs.get('database_table'))
         self.database_type = os.environ.get('PYWAY_TYPE', kwargs.get('database_type'))
         self.database_host = os.environ.get('PYWAY_DATABASE_HOST', kwargs.get('database_host'))
@@ -14,12 +21,30 @@ class ConfigFile():
         self.database_username = os.environ.get('PYWAY_DATABASE_USERNAME', kwargs.get('database_username'))
         self.database_password = os.environ.get('PYWAY_DATABASE_PASSWORD', kwargs.get('database_password'))
         self.database_collation = os.environ.get('PYWAY_DATABASE_COLLATION', kwargs.get('database_collation'))
+        self.database_pool_size = os.environ.get('PYWAY_DATABASE_POOL_SIZE', kwargs.get('database_pool_size'))
+        self.database_replica_host = os.environ.get('PYWAY_DATABASE_REPLICA_HOST', kwargs.get('database_replica_host'))
+        self.database_replica_port = os.environ.get('PYWAY_DATABASE_REPLICA_PORT', kwargs.get('database_replica_port'))
+        self.database_replica_username = os.environ.get('PYWAY_DATABASE_REPLICA_USERNAME',
+                                                        kwargs.get('database_replica_username'))
+        self.database_replica_password = os.environ.get('PYWAY_DATABASE_REPLICA_PASSWORD',
+                                                        kwargs.get('database_replica_password'))
+        self.database_replica_max_lag = os.environ.get('PYWAY_DATABASE_REPLICA_MAX_LAG',
+                                                       kwargs.get('database_replica_max_lag'))
+        self.database_driver = os.environ.get('PYWAY_DATABASE_DRIVER', kwargs.get('database_driver'))
+        self.database_bulk_mode = os.environ.get('PYWAY_DATABASE_BULK_MODE', kwargs.get('database_bulk_mode'))
+        self.checksum_workers = os.environ.get('PYWAY_CHECKSUM_WORKERS', kwargs.get('checksum_workers'))
+        self.checksum_cache = os.environ.get('PYWAY_CHECKSUM_CACHE', kwargs.get('checksum_cache'))
+        self.checksum_algorithm = os.environ.get('PYWAY_CHECKSUM_ALGORITHM', kwargs.get('checksum_algorithm'))
         self.schema_file: Union[str, None] = None
         self.checksum_file = None
+        self.checksum_all = None
         self.config = os.environ.get('PYWAY_CONFIG_FILE', '.pyway.conf')
         self.version = False
         self.async_mode = None
+        self.async_driver = None
+        self.atomic_mode = None
         self.cmd = None
+        self.read_only = False
         self.prepared_for_python_migrations = False
 
     def merge(self, other: 'ConfigFile') -> None:
@@ -35,14 +60,37 @@ class ConfigFile():
         # This is necessary for the Python migrations to be able to reference modules relative to the current working directory
         sys.path.append(os.getcwd())
 
-        # Make sure all database connection environment variables are set
-        os.environ['PYWAY_DATABASE_TYPE'] = self.database_type
-        os.environ['PYWAY_DATABASE_HOST'] = self.database_host
-        os.environ['PYWAY_DATABASE_PORT'] = str(self.database_port)
-        os.environ['PYWAY_DATABASE_NAME'] = self.database_name
-        os.environ['PYWAY_DATABASE_USERNAME'] = self.database_username
-        os.environ['PYWAY_DATABASE_PASSWORD'] = self.database_password
-        os.environ['PYWAY_DATABASE_COLLATION'] = self.database_collation
+    @contextmanager
+    def python_migration_environment(self) -> Iterator[None]:
+        """Database settings as environment variables while one Python migration runs
+
+        The previous values come back afterwards: exported for good they would take priority
+        over the settings of every later ConfigFile of an application embedding pyway.
+        """
+        self.prepare_for_python_migrations()
+
+        # Settings left out (e.g. when the application supplies the connection) are skipped
+        environment = {
+            'PYWAY_DATABASE_TYPE': self.database_type,
+            'PYWAY_DATABASE_HOST': self.database_host,
+            'PYWAY_DATABASE_PORT': self.database_port,
+            'PYWAY_DATABASE_NAME': self.database_name,
+            'PYWAY_DATABASE_USERNAME': self.database_username,
+            'PYWAY_DATABASE_PASSWORD': self.database_password,
+            'PYWAY_DATABASE_COLLATION': self.database_collation,
+        }
+        previous = {name: os.environ.get(name) for name in environment}
+        try:
+            for name, value in environment.items():
+                if value is not None:
+                    os.environ[name] = str(value)
+            yield
+        finally:
+            for name, value in previous.items():
+                if value is None:
+                    os.environ.pop(name, None)
+                else:
+                    os.environ[name] = value
 
 
 class MockConfig():
@@ -0,0 +1,93 @@
+import asyncio
+import importlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from pyway.configfile import ConfigFile
+
+
+class ThreadedConnection():
+    """Awaitable wrapper for drivers without an async client (SQLite, DuckDB).
+
+    The connection is opened and used on one dedicated worker thread, so the event loop never
+    waits on the database. Statements from concurrent coroutines run one after another on that
+    thread. The connection is in autocommit mode unless the migration begins a transaction.
+    """
+
+    def __init__(self, connect: Callable[[], Any]) -> None:
+        self._connect = connect
+        self._connection: Any = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pyway-db")
+
+    async def _run(self, function: Callable, *args: Any) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, function, *args)
+
+    async def open(self) -> 'ThreadedConnection':
+        self._connection = await self._run(self._connect)
+        return self
+
+    async def execute(self, statement: str, params: Sequence = ()) -> None:
+        await self._run(self._connection.execute, statement, params)
+
+    async def executemany(self, statement: str, rows: Iterable[Sequence]) -> None:
+        await self._run(self._connection.executemany, statement, list(rows))
+
+    async def fetchall(self, statement: str, params: Sequence = ()) -> List[Tuple]:
+        return await self._run(lambda: self._connection.execute(statement, params).fetchall())
+
+    async def fetchone(self, statement: str, params: Sequence = ()) -> Optional[Tuple]:
+        return await self._run(lambda: self._connection.execute(statement, params).fetchone())
+
+    async def commit(self) -> None:
+        await self._run(self._connection.commit)
+
+    async def rollback(self) -> None:
+        await self._run(self._connection.rollback)
+
+    async def close(self) -> None:
+        if self._connection is not None:
+            await self._run(self._connection.close)
+            self._connection = None
+        self._executor.shutdown(wait=True)
+
+
+async def postgres_pool(config: ConfigFile) -> Any:
+    """asyncpg pool, each statement commits on its own unless run in pool.transaction()"""
+    asyncpg = importlib.import_module('asyncpg')
+    params: Dict[str, Any] = {
+        'host': config.database_host,
+        'database': config.database_name,
+        'user': config.database_username,
+    }
+
+    if config.database_password:
+        params['password'] = config.database_password
+
+    if config.database_port:
+        params['port'] = int(config.database_port)
+
+    return await asyncpg.create_pool(**params)
+
+
+async def mysql_pool(config: ConfigFile) -> Any:
+    """aiomysql pool in autocommit mode"""
+    aiomysql = importlib.import_module('aiomysql')
+    params: Dict[str, Any] = {
+        'host': config.database_host,
+        'db': config.database_name,
+        'user': config.database_username,
+        'autocommit': True,
+    }
+
+    if config.database_password:
+        params['password'] = config.database_password
+
+    if config.database_port:
+        params['port'] = int(config.database_port)
+
+    if config.database_collation:
+        # aiomysql has no collation option, the character set is its prefix
+        params['charset'] = config.database_collation.split('_')[0]
+        params['init_command'] = f"SET collation_connection = '{config.database_collation}'"
+
+    return await aiomysql.create_pool(**params)
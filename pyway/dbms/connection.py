@@ -0,0 +1,86 @@
+from typing import Any, Callable
+
+
+def driver_connection(connection: Any) -> Any:
+    """Driver connection behind a SQLAlchemy pool proxy
+
+    Attributes set on the proxy (e.g. autocommit) never reach the driver. dbapi_connection
+    covers older SQLAlchemy releases.
+    """
+    driver = getattr(connection, 'driver_connection', None)
+    return driver if driver is not None else getattr(connection, 'dbapi_connection', connection)
+
+
+class BorrowedConnection():
+    """Proxy for a connection pyway doesn't own, close() hands it back instead of closing it
+
+    An autocommit mode set through the proxy is reverted before the connection is handed back.
+    """
+
+    def __init__(self, connection: Any, release: Callable[[], None]) -> None:
+        object.__setattr__(self, '_connection', connection)
+        object.__setattr__(self, '_release', release)
+        object.__setattr__(self, '_released', False)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._connection, name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        if name == 'autocommit' and '_autocommit' not in self.__dict__:
+            # The application's own mode comes back when the connection is handed back
+            object.__setattr__(self, '_autocommit', self._connection.autocommit)
+        setattr(self._connection, name, value)
+
+    @property
+    def closed(self) -> Any:
+        # Handed back counts as closed, so adapters acquire again instead of reusing it
+        return True if self._released else self._connection.closed
+
+    def close(self) -> None:
+        if not self._released:
+            object.__setattr__(self, '_released', True)
+            try:
+                if '_autocommit' in self.__dict__ and self._connection.autocommit != self._autocommit:
+                    self._connection.autocommit = self._autocommit
+            finally:
+                self._release()
+
+
+class ConnectionSource():
+    """Connections supplied by an embedding application instead of opened from the config.
+
+    source is one of:
+    - a DB-API connection, used as is and never closed
+    - a SQLAlchemy Engine or Pool, a psycopg2 or psycopg_pool pool, or a mysql-connector pool,
+      connections are taken from it and handed back
+    - a callable returning a new connection, which is closed when pyway is done with it
+    """
+
+    def __init__(self, source: Any) -> None:
+        self.source = source
+
+    def acquire(self) -> BorrowedConnection:
+        source = self.source
+        if hasattr(source, 'raw_connection'):
+            # SQLAlchemy Engine, close() returns the connection to the engine's pool
+            connection = source.raw_connection()
+            return BorrowedConnection(driver_connection(connection), connection.close)
+        if hasattr(source, 'connect') and hasattr(source, 'dispose'):
+            # SQLAlchemy Pool
+            connection = source.connect()
+            return BorrowedConnection(driver_connection(connection), connection.close)
+        if hasattr(source, 'getconn') and hasattr(source, 'putconn'):
+            # psycopg2.pool and psycopg_pool
+            connection = source.getconn()
+            return BorrowedConnection(connection, lambda: source.putconn(connection))
+        if hasattr(source, 'get_connection'):
+            # mysql-connector pool, close() returns the connection to the pool
+            connection = source.get_connection()
+            return BorrowedConnection(connection, connection.close)
+        if hasattr(source, 'cursor'):
+            # Checked before callable(), sqlite3 connections are callable
+            return BorrowedConnection(source, lambda: None)
+        if callable(source):
+            connection = source()
+            return BorrowedConnection(connection, connection.close)
+        raise TypeError(f"Unsupported connection source: {type(source).__name__}")
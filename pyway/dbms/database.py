@@ -1,8 +1,134 @@
+import copy
+import itertools
+from contextlib import contextmanager
 from pydoc import locate
-from typing import Any, Union
+from typing import Any, Callable, Iterator, Optional, Set, Tuple, TypeVar, Union
+
+from pyway.configfile import ConfigFile
+from pyway.errors import REPLICA_LAG_WARNING, REPLICA_UNAVAILABLE_WARNING, VERSION_TABLE_MISSING_ERROR
+from pyway.log import logger
+
+# History tables known to exist, keyed by (dbms, host, port, database, table). Shared by every
+# adapter in the process so the create-if-not-exists DDL runs at most once per target.
+ENSURED_VERSION_TABLES: Set[Tuple[Any, ...]] = set()
+
+T = TypeVar('T')
 
 
 def factory(dbms: Union[str, None]) -> Any:
     if dbms:
         return locate('pyway.dbms.%s.%s' % (dbms, dbms.title()))
     return None
+
+
+# Supplied connections carry no address, and id() values are reused once an object is gone,
+# so every adapter given a connection gets a number of its own
+SOURCE_NUMBERS = itertools.count(1)
+
+
+def version_table_key(dbms: str, config: ConfigFile, connection: Any = None) -> Tuple[Any, ...]:
+    source = next(SOURCE_NUMBERS) if connection is not None else None
+    return (dbms, config.database_host, config.database_port, config.database_name, config.database_table, source)
+
+
+def missing_version_table(db: Any, error: Exception) -> bool:
+    """Whether error says db's history table doesn't exist, not some other table a migration uses"""
+    return db.is_missing_table(error) and db.version_table.split('.')[-1] in str(error)
+
+
+def recreate_version_table(db: Any) -> None:
+    """Create db's history table again after it was dropped (or the database file replaced)"""
+    ENSURED_VERSION_TABLES.discard(db.version_table_key)
+    db.create_version_table_if_not_exists()
+
+
+def with_version_table(db: Any, work: Callable[[], T]) -> T:
+    """Ensure db's history table, then run work, a transaction of its own that writes to it
+
+    The table may have been dropped since this process ensured it. Then work's transaction
+    was rolled back, so the table is created again and work runs once more. This covers a
+    migration applied atomically with its history row as well as a single history write.
+    """
+    db.create_version_table_if_not_exists()
+    try:
+        return work()
+    except Exception as error:
+        if not missing_version_table(db, error):
+            raise
+    recreate_version_table(db)
+    return work()
+
+
+def required_version_table(version_table: Optional[str]) -> str:
+    """The configured history table name, which creating the table and its index needs"""
+    if not version_table:
+        raise RuntimeError(VERSION_TABLE_MISSING_ERROR)
+    return version_table
+
+
+def version_index_name(version_table: str) -> str:
+    """Name of the unique version index, created in the history table's schema"""
+    return f"{version_table.split('.')[-1]}_version_idx"
+
+
+@contextmanager
+def session(config: ConfigFile, connection: Any = None) -> Iterator[Any]:
+    """Open one database adapter for the lifetime of a command and always release it
+
+    connection is an optional connection, pool or connection factory owned by the caller,
+    see ConnectionSource. Borrowed connections are handed back, never closed.
+    """
+    db = factory(config.database_type)(config, connection)
+    try:
+        yield db
+    finally:
+        db.disconnect()
+
+
+def replica_config(config: ConfigFile) -> Optional[ConfigFile]:
+    """Config for the read-only endpoint, None when none is configured
+
+    Port and credentials default to the primary's.
+    """
+    if not config.database_replica_host:
+        return None
+    replica = copy.copy(config)
+    replica.database_host = config.database_replica_host
+    replica.database_port = config.database_replica_port or config.database_port
+    replica.database_username = config.database_replica_username or config.database_username
+    replica.database_password = config.database_replica_password or config.database_password
+    replica.read_only = True
+    return replica
+
+
+@contextmanager
+def read_session(config: ConfigFile) -> Iterator[Any]:
+    """session() for commands that only read the history table, served by the replica when configured
+
+    With database_replica_max_lag set, the replica's lag is checked first and the primary is used
+    when it is further behind or can't be reached.
+    """
+    replica = replica_config(config)
+    if replica is None:
+        with session(config) as db:
+            yield db
+        return
+
+    db = factory(config.database_type)(replica)
+    if config.database_replica_max_lag is not None:
+        max_lag = float(config.database_replica_max_lag)
+        try:
+            lag = db.replication_lag()
+        except Exception as error:
+            db.disconnect()
+            logger.warning(REPLICA_UNAVAILABLE_WARNING % (replica.database_host, error))
+            db = factory(config.database_type)(config)
+        else:
+            if lag is None or lag > max_lag:
+                db.disconnect()
+                logger.warning(REPLICA_LAG_WARNING % (replica.database_host, lag, max_lag))
+                db = factory(config.database_type)(config)
+    try:
+        yield db
+    finally:
+        db.disconnect()
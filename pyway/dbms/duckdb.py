@@ -2,12 +2,20 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
 
-from typing import List
+import os
+from contextlib import contextmanager
+from typing import Any, Iterator, List, Optional, Tuple, Union
 
 import duckdb
 
 from pyway.migration import Migration
 from pyway.configfile import ConfigFile
+from pyway.dbms.aio import ThreadedConnection
+from pyway.dbms.connection import BorrowedConnection, ConnectionSource
+from pyway.dbms.database import (ENSURED_VERSION_TABLES, required_version_table, version_index_name, version_table_key,
+                                 with_version_table)
+from pyway.errors import DUPLICATE_VERSIONS_WARNING
+from pyway.log import logger
 
 CREATE_VERSION_MIGRATIONS_SEQ = "create sequence if not exists migration_seq;"
 CREATE_VERSION_MIGRATIONS = "create table if not exists %s ("\
@@ -18,44 +26,117 @@ CREATE_VERSION_MIGRATIONS = "create table if not exists %s ("\
     "checksum varchar(25) NOT NULL,"\
     "apply_timestamp timestamp DEFAULT NOW()"\
     ");"
+CREATE_VERSION_INDEX = "create unique index if not exists %s on %s (version);"
 SELECT_FIELDS = ("version", "extension", "name", "checksum", "apply_timestamp")
 ORDER_BY_FIELD_ASC = "installed_rank"
 ORDER_BY_FIELD_DESC = "installed_rank desc"
-INSERT_VERSION_MIGRATE = "insert into %s (version, extension, name, checksum) values ('%s', '%s', '%s', '%s');"
-UPDATE_CHECKSUM = "update %s set checksum='%s' where version='%s';"
+# Only the table name is formatted in, values are bound so the statement text never changes
+INSERT_VERSION_MIGRATE = "insert into %s (version, extension, name, checksum) values (?, ?, ?, ?);"
+UPDATE_CHECKSUM = "update %s set checksum=? where version=?;"
+
+# The database handle, opened from the config or borrowed from the application. Work runs
+# on cursors of it, which are driver connections either way
+DatabaseHandle = Union[duckdb.DuckDBPyConnection, BorrowedConnection]
 
 
 class Duckdb():
 
-    def __init__(self, args: ConfigFile) -> None:
+    def __init__(self, args: ConfigFile, connection: Any = None) -> None:
         self.args = args
         self.version_table = args.database_table
-        self._db = duckdb.connect(f"{self.args.database_name}")
-        self.create_version_table_if_not_exists()
+        # Read-only commands neither create the database file nor change it
+        self.read_only = bool(args.read_only)
+        self._db: Optional[DatabaseHandle] = None
+        # An application's connection avoids a second handle on the file and its lock
+        self._source = ConnectionSource(connection) if connection is not None else None
+        self.version_table_key = version_table_key('duckdb', args, connection)
 
     def connect(self) -> duckdb.DuckDBPyConnection:
-        return self._db.cursor()  # noqa: E501
+        if self._db is None:
+            self._db = self._open()
+        return self._db.cursor()
+
+    def _open(self) -> DatabaseHandle:
+        if self._source is not None:
+            return self._source.acquire()
+        if self.read_only and not os.path.exists(f"{self.args.database_name}"):
+            # Nothing migrated yet, like a missing history table. DuckDB can't open a missing file
+            # read-only and must not create one, an empty in-memory database reads the same
+            return duckdb.connect(":memory:")
+        return duckdb.connect(f"{self.args.database_name}", read_only=self.read_only)
 
     def disconnect(self) -> None:
-        self._db.close()
+        if self._db is not None:
+            self._db.close()
+            self._db = None
 
     def create_version_table_if_not_exists(self) -> None:
+        if self.version_table_key in ENSURED_VERSION_TABLES:
+            return
+        version_table = required_version_table(self.version_table)
         self.execute(CREATE_VERSION_MIGRATIONS_SEQ)
-        self.execute(CREATE_VERSION_MIGRATIONS % self.version_table)
+        self.execute(CREATE_VERSION_MIGRATIONS % version_table)
+        try:
+            self.execute(CREATE_VERSION_INDEX % (version_index_name(version_table), version_table))
+        except duckdb.ConstraintException:
+            logger.warning(DUPLICATE_VERSIONS_WARNING % self.version_table)
+        ENSURED_VERSION_TABLES.add(self.version_table_key)
+
+    @staticmethod
+    def is_missing_table(error: Exception) -> bool:
+        return isinstance(error, duckdb.CatalogException)
+
+    def replication_lag(self) -> Optional[float]:
+        """Embedded databases have no replicas"""
+        return 0.0
 
     def should_close_connection(self) -> bool:
         """DuckDB uses a persistent connection"""
         return False
 
-    def execute(self, script: str) -> None:
+    def supports_transactional_ddl(self) -> bool:
+        """DuckDB can commit a migration and its history row together"""
+        return True
+
+    def prepare_migrate(self) -> None:
+        """DuckDB needs no session changes before applying migrations"""
+
+    @contextmanager
+    def transaction(self) -> Iterator[duckdb.DuckDBPyConnection]:
         cur = self.connect()
         cur.begin()
-        cur.execute(script)
-        cur.commit()
+        try:
+            yield cur
+            cur.commit()
+        except Exception:
+            cur.rollback()
+            raise
+        finally:
+            cur.close()
+
+    async def connect_async(self) -> ThreadedConnection:
+        """Thread-backed cursor handed to async Python migrations with --async-driver"""
+        return await ThreadedConnection(self.connect).open()
+
+    async def disconnect_async(self, connection: ThreadedConnection) -> None:
+        await connection.close()
+
+    def execute(self, script: str, connection: Optional[duckdb.DuckDBPyConnection] = None) -> None:
+        """Run script in its own transaction, or inside connection's open transaction without committing"""
+        if connection is None:
+            with self.transaction() as cur:
+                cur.execute(script)
+            return
+        connection.execute(script)
 
     def get_all_schema_migrations(self) -> List[Migration]:
         cursor = self.connect()
-        cursor.execute(f"SELECT {','.join(SELECT_FIELDS)} FROM {self.version_table} ORDER BY {ORDER_BY_FIELD_ASC}")
+        try:
+            cursor.execute(f"SELECT {','.join(SELECT_FIELDS)} FROM {self.version_table} ORDER BY {ORDER_BY_FIELD_ASC}")
+        except duckdb.CatalogException:
+            # Nothing migrated yet, reads never create the table
+            cursor.close()
+            return []
         migrations = []
         for row in cursor.fetchall():
             migrations.append(Migration(row[0], row[1], row[2], row[3], row[4]))
@@ -71,10 +152,23 @@ class Duckdb():
         cursor.close()
         return migration
 
-    def upgrade_version(self, migration: Migration) -> None:
-        self.execute(INSERT_VERSION_MIGRATE % (self.version_table, migration.version,
-                                               migration.extension, migration.name,
-                                               migration.checksum))
+    def upgrade_version(self, migration: Migration, connection: Optional[duckdb.DuckDBPyConnection] = None) -> None:
+        self._write_history(INSERT_VERSION_MIGRATE % self.version_table,
+                            (migration.version, migration.extension, migration.name, migration.checksum),
+                            connection)
 
     def update_checksum(self, migration: Migration) -> None:
-        self.execute(UPDATE_CHECKSUM % (self.version_table, migration.checksum, migration.version))
+        self._write_history(UPDATE_CHECKSUM % self.version_table, (migration.checksum, migration.version))
+
+    def _write_history(self, statement: str, params: Tuple,
+                       connection: Optional[duckdb.DuckDBPyConnection] = None) -> None:
+        if connection is not None:
+            # Joins the caller's transaction, see with_version_table()
+            connection.execute(statement, params)
+            return
+
+        def write() -> None:
+            with self.transaction() as cur:
+                self._write_history(statement, params, cur)
+
+        with_version_table(self, write)
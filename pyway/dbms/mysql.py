@@ -1,12 +1,17 @@
+import importlib
 import mysql.connector
-from mysql.connector.connection import MySQLConnection
-from mysql.connector.connection import MySQLConnectionAbstract
-from mysql.connector.connection_cext import CMySQLConnection
-from mysql.connector.pooling import PooledMySQLConnection
-from typing import List, Union
+from mysql.connector import errorcode
+from mysql.connector.pooling import MySQLConnectionPool
+from typing import Any, Dict, List, Optional, Set, Tuple, Type
 
 from pyway.migration import Migration
 from pyway.configfile import ConfigFile
+from pyway.dbms.aio import mysql_pool
+from pyway.dbms.connection import ConnectionSource
+from pyway.dbms.database import (ENSURED_VERSION_TABLES, required_version_table, version_index_name, version_table_key,
+                                 with_version_table)
+from pyway.errors import DUPLICATE_VERSIONS_WARNING, UNKNOWN_DRIVER_ERROR, DRIVER_POOL_ERROR
+from pyway.log import logger
 
 
 CREATE_VERSION_MIGRATIONS = "create table if not exists %s ("\
@@ -17,26 +22,90 @@ CREATE_VERSION_MIGRATIONS = "create table if not exists %s ("\
     "checksum varchar(25) NOT NULL,"\
     "apply_timestamp timestamp DEFAULT NOW()"\
     ");"
+# In-place so existing history tables stay writable while the index is built
+CREATE_VERSION_INDEX = "alter table %s add unique index %s (version), algorithm=inplace, lock=none;"
+SELECT_VERSION_INDEX = "select count(*) from information_schema.statistics "\
+    "where table_schema = coalesce(%s, database()) and table_name = %s and index_name = %s;"
+# SHOW SLAVE STATUS is for servers older than 8.0.22
+SHOW_REPLICA_STATUS = ("show replica status;", "show slave status;")
+# MariaDB keeps the old column name with SHOW REPLICA STATUS
+LAG_COLUMNS = ("Seconds_Behind_Source", "Seconds_Behind_Master")
 SELECT_FIELDS = ("version", "extension", "name", "checksum", "apply_timestamp")
 ORDER_BY_FIELD_ASC = "installed_rank"
 ORDER_BY_FIELD_DESC = "installed_rank desc"
-INSERT_VERSION_MIGRATE = "insert into %s (version, extension, name, checksum) values ('%s', '%s', '%s', '%s');"
-UPDATE_CHECKSUM = "update %s set checksum='%s' where version='%s';"
+# Only the table name is formatted in, values are bound so the statement text never changes
+INSERT_VERSION_MIGRATE = "insert into %s (version, extension, name, checksum) values (%%s, %%s, %%s, %%s);"
+UPDATE_CHECKSUM = "update %s set checksum=%%s where version=%%s;"
+# cext: mysql-connector's C extension, falls back to pure when it isn't built for this platform
+# pure: mysql-connector's pure Python protocol implementation
+# mysqlclient: the MySQLdb module, which wraps libmysqlclient
+DRIVERS = ("cext", "pure", "mysqlclient")
+DEFAULT_DRIVER = "cext"
+
+
+def resolve_driver(name: Optional[str]) -> str:
+    """Driver actually used for the configured name"""
+    driver = (name or DEFAULT_DRIVER).lower()
+    if driver not in DRIVERS:
+        raise ValueError(UNKNOWN_DRIVER_ERROR % (name, '|'.join(DRIVERS)))
+    if driver == "cext" and not mysql.connector.HAVE_CEXT:
+        return "pure"
+    return driver
 
 
 class Mysql():
 
-    def __init__(self, config: ConfigFile) -> None:
+    def __init__(self, config: ConfigFile, connection: Any = None) -> None:
         self.config = config
         self.version_table = config.database_table
-        self.create_version_table_if_not_exists()
+        self.driver = resolve_driver(config.database_driver)
+        self.pool_size = int(config.database_pool_size) if config.database_pool_size else 0
+        if self.pool_size and self.driver == "mysqlclient":
+            raise ValueError(DRIVER_POOL_ERROR % self.driver)
+        self._pool: Optional[MySQLConnectionPool] = None
+        self._seen_connections: Set[int] = set()
+        # Physical connections established versus connections handed out again
+        self.connections_opened = 0
+        self.connections_reused = 0
+        # Connections supplied by an embedding application, see ConnectionSource
+        self._source = ConnectionSource(connection) if connection is not None else None
+        self.version_table_key = version_table_key('mysql', config, connection)
+        # MySQLdb is only imported when selected, mysql-connector stays the default dependency
+        self._mysqldb: Any = importlib.import_module('MySQLdb') if self.driver == "mysqlclient" else None
+        self._error: Type[Exception] = self._mysqldb.Error if self._mysqldb else mysql.connector.Error
+
+    def connect(self) -> Any:
+        if self._source is not None:
+            # close() after each operation hands the connection back to the application
+            return self._source.acquire()
+
+        if self._mysqldb is not None:
+            self.connections_opened += 1
+            return self._mysqldb.connect(**self._mysqldb_params())
+
+        if not self.pool_size:
+            self.connections_opened += 1
+            return mysql.connector.connect(**self._connection_params())
 
-    def connect(self) -> Union[PooledMySQLConnection, MySQLConnection, CMySQLConnection, MySQLConnectionAbstract]:
+        if self._pool is None:
+            self._pool = MySQLConnectionPool(pool_size=self.pool_size, **self._connection_params())
+        cnx = self._pool.get_connection()
+        # Closing a pooled connection hands it back to the pool, so the same
+        # physical connection, with the same server thread id, comes back out on the next request
+        physical = cnx.connection_id
+        if physical in self._seen_connections:
+            self.connections_reused += 1
+        else:
+            self._seen_connections.add(physical)
+            self.connections_opened += 1
+        return cnx
+
+    def _connection_params(self) -> Dict[str, Any]:
         connection_params = {
             'host': self.config.database_host,
             'database': self.config.database_name,
             'user': self.config.database_username,
-            'use_pure': True,
+            'use_pure': self.driver == "pure",
             'collation': self.config.database_collation
         }
 
@@ -46,26 +115,166 @@ class Mysql():
         if self.config.database_port:
             connection_params['port'] = self.config.database_port
 
-        return mysql.connector.connect(**connection_params)
+        return connection_params
+
+    def _mysqldb_params(self) -> Dict[str, Any]:
+        # MySQLdb enables multi-statement scripts by default
+        connection_params: Dict[str, Any] = {
+            'host': self.config.database_host,
+            'database': self.config.database_name,
+            'user': self.config.database_username,
+        }
+
+        if self.config.database_password:
+            connection_params['password'] = self.config.database_password
+
+        if self.config.database_port:
+            connection_params['port'] = int(self.config.database_port)
+
+        if self.config.database_collation:
+            # MySQLdb has no collation option, the character set is its prefix
+            collation = self.config.database_collation
+            connection_params['charset'] = collation.split('_')[0]
+            connection_params['init_command'] = f"SET collation_connection = '{collation}'"
+
+        return connection_params
+
+    def _errno(self, error: Exception) -> Optional[int]:
+        """Server error code, mysql-connector keeps it in errno and MySQLdb in the first argument"""
+        if isinstance(error, mysql.connector.Error):
+            return error.errno
+        return error.args[0] if error.args and isinstance(error.args[0], int) else None
+
+    def _buffered_cursor(self, cnx: Any) -> Any:
+        # MySQLdb cursors always buffer the result set
+        return cnx.cursor() if self._mysqldb else cnx.cursor(buffered=True)
+
+    def disconnect(self) -> None:
+        if self._pool is None:
+            return
+        # Every connection is back in the pool, take them all out and close them for good
+        # instead of handing them back
+        while True:
+            try:
+                cnx = self._pool.get_connection()
+            except mysql.connector.Error:
+                # PoolError once the pool is empty. A connection that can't be reconnected
+                # is closed along with the pool
+                break
+            try:
+                cnx.disconnect()
+            except self._error:
+                # Already gone, e.g. closed by the server
+                pass
+        self._pool = None
 
     def create_version_table_if_not_exists(self) -> None:
+        if self.version_table_key in ENSURED_VERSION_TABLES:
+            return
         self.execute(CREATE_VERSION_MIGRATIONS % self.version_table)
+        self._create_version_index_if_not_exists()
+        ENSURED_VERSION_TABLES.add(self.version_table_key)
+
+    def _create_version_index_if_not_exists(self) -> None:
+        """Add the unique version index, also to tables created by older releases"""
+        version_table = required_version_table(self.version_table)
+        index = version_index_name(version_table)
+        schema, _, table = version_table.rpartition('.')
+
+        cnx = self.connect()
+        try:
+            cursor = cnx.cursor()
+            cursor.execute(SELECT_VERSION_INDEX, (schema or None, table, index))
+            row = cursor.fetchone()
+            cursor.close()
+        finally:
+            cnx.close()
+        if row and row[0]:
+            return
+
+        try:
+            self.execute(CREATE_VERSION_INDEX % (self.version_table, index))
+        except self._error as error:
+            if self._errno(error) != errorcode.ER_DUP_ENTRY:
+                raise
+            logger.warning(DUPLICATE_VERSIONS_WARNING % self.version_table)
+
+    def is_missing_table(self, error: Exception) -> bool:
+        return isinstance(error, self._error) and self._errno(error) == errorcode.ER_NO_SUCH_TABLE
+
+    def replication_lag(self) -> Optional[float]:
+        """Seconds this server is behind its source, None when unknown or replication is stopped"""
+        cnx = self.connect()
+        try:
+            for statement in SHOW_REPLICA_STATUS:
+                # One row per replication channel
+                cursor = self._buffered_cursor(cnx)
+                try:
+                    cursor.execute(statement)
+                except self._error as error:
+                    if self._errno(error) != errorcode.ER_PARSE_ERROR:
+                        raise
+                    continue
+                row = cursor.fetchone()
+                names = [description[0] for description in cursor.description or ()]
+                cursor.close()
+                if row is None:
+                    # Not a replica
+                    return 0.0
+                column = next((name for name in LAG_COLUMNS if name in names), None)
+                if column is None:
+                    return None
+                lag = row[names.index(column)]
+                return float(lag) if lag is not None else None
+        finally:
+            cnx.close()
+        return None
 
     def should_close_connection(self) -> bool:
         """MySQL closes connections after each operation"""
         return True
 
+    def supports_transactional_ddl(self) -> bool:
+        """MySQL commits DDL implicitly, so a migration and its history row cannot share a transaction"""
+        return False
+
+    def prepare_migrate(self) -> None:
+        """MySQL needs no session changes before applying migrations"""
+
+    async def connect_async(self) -> Any:
+        """aiomysql pool handed to async Python migrations with --async-driver"""
+        return await mysql_pool(self.config)
+
+    async def disconnect_async(self, pool: Any) -> None:
+        pool.close()
+        await pool.wait_closed()
+
     def execute(self, script: str) -> None:
         cnx = self.connect()
-        for _ in cnx.cmd_query_iter(script):
-            pass
-        cnx.commit()
-        cnx.close()
+        try:
+            # Without arguments the script is sent as is, every result set has to be drained.
+            # The C extension has no cmd_query_iter(), cursors take multi-statement scripts
+            # with all three backends
+            cursor = cnx.cursor()
+            cursor.execute(script)
+            while cursor.nextset():
+                pass
+            cursor.close()
+            cnx.commit()
+        finally:
+            cnx.close()
 
     def get_all_schema_migrations(self) -> List[Migration]:
         cnx = self.connect()
         cursor = cnx.cursor()
-        cursor.execute(f"SELECT {','.join(SELECT_FIELDS)} FROM {self.version_table} ORDER BY {ORDER_BY_FIELD_ASC}")
+        try:
+            cursor.execute(f"SELECT {','.join(SELECT_FIELDS)} FROM {self.version_table} ORDER BY {ORDER_BY_FIELD_ASC}")
+        except self._error as error:
+            # Nothing migrated yet, reads never create the table
+            cnx.close()
+            if self._errno(error) == errorcode.ER_NO_SUCH_TABLE:
+                return []
+            raise
         migrations = []
         for row in cursor.fetchall():
             migrations.append(Migration(row[0], row[1], row[2], row[3], row[4]))
@@ -75,7 +284,7 @@ class Mysql():
 
     def get_schema_migration(self, version: str) -> Migration:
         cnx = self.connect()
-        cursor = cnx.cursor(buffered=True)
+        cursor = self._buffered_cursor(cnx)
         cursor.execute(f"SELECT {','.join(SELECT_FIELDS)} FROM {self.version_table} WHERE version=%s", [version])
         row = cursor.fetchone()
         if row is not None:
@@ -85,9 +294,21 @@ class Mysql():
         return migration
 
     def upgrade_version(self, migration: Migration) -> None:
-        self.execute(INSERT_VERSION_MIGRATE % (self.version_table, migration.version,
-                                               migration.extension, migration.name,
-                                               migration.checksum))
+        self._write_history(INSERT_VERSION_MIGRATE % self.version_table,
+                            (migration.version, migration.extension, migration.name, migration.checksum))
 
     def update_checksum(self, migration: Migration) -> None:
-        self.execute(UPDATE_CHECKSUM % (self.version_table, migration.checksum, migration.version))
+        self._write_history(UPDATE_CHECKSUM % self.version_table, (migration.checksum, migration.version))
+
+    def _execute_statement(self, statement: str, params: Tuple) -> None:
+        cnx = self.connect()
+        try:
+            cursor = cnx.cursor()
+            cursor.execute(statement, params)
+            cursor.close()
+            cnx.commit()
+        finally:
+            cnx.close()
+
+    def _write_history(self, statement: str, params: Tuple) -> None:
+        with_version_table(self, lambda: self._execute_statement(statement, params))
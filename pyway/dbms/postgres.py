@@ -1,8 +1,16 @@
 import psycopg2
-from typing import List
+import psycopg2.errors
+from contextlib import contextmanager
+from typing import Any, Iterator, List, Optional, Tuple, Union
 
 from pyway.migration import Migration
 from pyway.configfile import ConfigFile
+from pyway.dbms.aio import postgres_pool
+from pyway.dbms.connection import BorrowedConnection, ConnectionSource
+from pyway.dbms.database import (ENSURED_VERSION_TABLES, required_version_table, version_index_name, version_table_key,
+                                 with_version_table)
+from pyway.errors import DUPLICATE_VERSIONS_WARNING
+from pyway.log import logger
 
 
 CREATE_VERSION_MIGRATIONS = "create table if not exists %s ("\
@@ -13,21 +21,49 @@ CREATE_VERSION_MIGRATIONS = "create table if not exists %s ("\
     "checksum varchar(25) NOT NULL,"\
     "apply_timestamp timestamp DEFAULT NOW()"\
     ");"
+CREATE_VERSION_INDEX = "create unique index concurrently if not exists %s on %s (version);"
+DROP_VERSION_INDEX = "drop index concurrently if exists %s;"
+SELECT_VERSION_INDEX_VALID = "select indisvalid from pg_index where indexrelid = to_regclass(%s);"
+# Seconds since the last replayed transaction on a standby, 0 on a primary
+# The last replayed commit gets older while the primary is idle, a replica streaming from its
+# primary that replayed everything it received is not behind. Without a streaming WAL receiver
+# the received position stands still, so only the age of the last replayed commit tells. The
+# status is only shown to roles with pg_read_all_stats, others get that age too.
+SELECT_REPLICATION_LAG = "select case when not pg_is_in_recovery() then 0 "\
+    "when pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() "\
+    "and exists (select 1 from pg_stat_wal_receiver where status = 'streaming') then 0 "\
+    "else extract(epoch from now() - pg_last_xact_replay_timestamp()) end;"
 SELECT_FIELDS = ("version", "extension", "name", "checksum", "apply_timestamp")
 ORDER_BY_FIELD_ASC = "installed_rank"
 ORDER_BY_FIELD_DESC = "installed_rank desc"
-INSERT_VERSION_MIGRATE = "insert into %s (version, extension, name, checksum) values ('%s', '%s', '%s', '%s');"
-UPDATE_CHECKSUM = "update %s set checksum='%s' where version='%s';"
+# Only the table name is formatted in, values are bound so the statement text never changes
+INSERT_VERSION_MIGRATE = "insert into %s (version, extension, name, checksum) values (%%s, %%s, %%s, %%s);"
+UPDATE_CHECKSUM = "update %s set checksum=%%s where version=%%s;"
+
+# The session connection, opened from the config or borrowed from the application
+SessionConnection = Union[psycopg2.extensions.connection, BorrowedConnection]
 
 
 class Postgres():
 
-    def __init__(self, args: ConfigFile) -> None:
+    def __init__(self, args: ConfigFile, connection: Any = None) -> None:
         self.args = args
         self.version_table = args.database_table
-        self.create_version_table_if_not_exists()
+        self._connection: Optional[SessionConnection] = None
+        # Connections supplied by an embedding application, see ConnectionSource
+        self._source = ConnectionSource(connection) if connection is not None else None
+        self.version_table_key = version_table_key('postgres', args, connection)
+
+    def connect(self) -> SessionConnection:
+        """Return the session connection, opening it on first use"""
+        if self._connection is None or self._connection.closed:
+            self._connection = self._open()
+        return self._connection
+
+    def _open(self) -> SessionConnection:
+        if self._source is not None:
+            return self._source.acquire()
 
-    def connect(self) -> psycopg2.extensions.connection:
         connection_string = f"dbname={self.args.database_name} user={self.args.database_username}"
         connection_string += f" host={self.args.database_host}"
 
@@ -39,28 +75,115 @@ class Postgres():
 
         return psycopg2.connect(connection_string)
 
+    def disconnect(self) -> None:
+        if self._connection is not None and not self._connection.closed:
+            self._connection.close()
+        self._connection = None
+
     def create_version_table_if_not_exists(self) -> None:
+        if self.version_table_key in ENSURED_VERSION_TABLES:
+            return
         self.execute(CREATE_VERSION_MIGRATIONS % self.version_table)
+        self._create_version_index_if_not_exists()
+        ENSURED_VERSION_TABLES.add(self.version_table_key)
+
+    def _create_version_index_if_not_exists(self) -> None:
+        """Add the unique version index, also to tables created by older releases, without blocking writers"""
+        version_table = required_version_table(self.version_table)
+        index = version_index_name(version_table)
+        schema = version_table.rpartition('.')[0]
+        qualified_index = f"{schema}.{index}" if schema else index
+
+        conn = self.connect()
+        with conn.cursor() as cur:
+            cur.execute(SELECT_VERSION_INDEX_VALID, (qualified_index,))
+            row = cur.fetchone()
+        conn.commit()
+        if row is not None and row[0]:
+            return
+
+        # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+        autocommit = conn.autocommit
+        conn.autocommit = True
+        try:
+            with conn.cursor() as cur:
+                if row is not None:
+                    # A previous concurrent build failed and left an invalid index behind
+                    cur.execute(DROP_VERSION_INDEX % qualified_index)
+                cur.execute(CREATE_VERSION_INDEX % (index, self.version_table))
+        except psycopg2.errors.UniqueViolation:
+            with conn.cursor() as cur:
+                cur.execute(DROP_VERSION_INDEX % qualified_index)
+            logger.warning(DUPLICATE_VERSIONS_WARNING % self.version_table)
+        finally:
+            conn.autocommit = autocommit
+
+    @staticmethod
+    def is_missing_table(error: Exception) -> bool:
+        return isinstance(error, psycopg2.errors.UndefinedTable)
+
+    def replication_lag(self) -> Optional[float]:
+        """Seconds this server is behind its primary, None when unknown"""
+        conn = self.connect()
+        with conn.cursor() as cur:
+            cur.execute(SELECT_REPLICATION_LAG)
+            row = cur.fetchone()
+        conn.commit()
+        return float(row[0]) if row is not None and row[0] is not None else None
 
     def should_close_connection(self) -> bool:
         """PostgreSQL doesn't close connections after each operation"""
         return False
 
-    def execute(self, script: str) -> None:
+    def supports_transactional_ddl(self) -> bool:
+        """PostgreSQL can commit a migration and its history row together"""
+        return True
+
+    def prepare_migrate(self) -> None:
+        """PostgreSQL needs no session changes before applying migrations"""
+
+    @contextmanager
+    def transaction(self) -> Iterator[SessionConnection]:
         conn = self.connect()
-        cur = conn.cursor()
-        cur.execute(script)
-        conn.commit()
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            # Leave the shared session usable for the next statement
+            conn.rollback()
+            raise
+
+    async def connect_async(self) -> Any:
+        """asyncpg pool handed to async Python migrations with --async-driver"""
+        return await postgres_pool(self.args)
+
+    async def disconnect_async(self, pool: Any) -> None:
+        await pool.close()
+
+    def execute(self, script: str, connection: Optional[SessionConnection] = None) -> None:
+        """Run script in its own transaction, or inside connection's open transaction without committing"""
+        if connection is None:
+            with self.transaction() as conn:
+                self.execute(script, conn)
+            return
+        with connection.cursor() as cur:
+            cur.execute(script)
 
     def get_all_schema_migrations(self) -> List[Migration]:
         cnx = self.connect()
         cursor = cnx.cursor()
-        cursor.execute(f"SELECT {','.join(SELECT_FIELDS)} FROM {self.version_table} ORDER BY {ORDER_BY_FIELD_ASC}")
+        try:
+            cursor.execute(f"SELECT {','.join(SELECT_FIELDS)} FROM {self.version_table} ORDER BY {ORDER_BY_FIELD_ASC}")
+        except psycopg2.errors.UndefinedTable:
+            # Nothing migrated yet, reads never create the table
+            cnx.rollback()
+            return []
         migrations = []
         for row in cursor.fetchall():
             migrations.append(Migration(row[0], row[1], row[2], row[3], row[4]))
         cursor.close()
-        cnx.close()
+        # End the read transaction so the session does not sit idle in transaction
+        cnx.commit()
         return migrations
 
     def get_schema_migration(self, version: str) -> Migration:
@@ -71,13 +194,28 @@ class Postgres():
         if row is not None:
             migration = Migration(row[0], row[1], row[2], row[3], row[4])
         cursor.close()
-        cnx.close()
+        cnx.commit()
         return migration
 
-    def upgrade_version(self, migration: Migration) -> None:
-        self.execute(INSERT_VERSION_MIGRATE % (self.version_table, migration.version,
-                                               migration.extension, migration.name,
-                                               migration.checksum))
+    def upgrade_version(self, migration: Migration,
+                        connection: Optional[SessionConnection] = None) -> None:
+        self._write_history(INSERT_VERSION_MIGRATE % self.version_table,
+                            (migration.version, migration.extension, migration.name, migration.checksum),
+                            connection)
 
     def update_checksum(self, migration: Migration) -> None:
-        self.execute(UPDATE_CHECKSUM % (self.version_table, migration.checksum, migration.version))
+        self._write_history(UPDATE_CHECKSUM % self.version_table, (migration.checksum, migration.version))
+
+    def _write_history(self, statement: str, params: Tuple,
+                       connection: Optional[SessionConnection] = None) -> None:
+        if connection is not None:
+            # Joins the caller's transaction, see with_version_table()
+            with connection.cursor() as cur:
+                cur.execute(statement, params)
+            return
+
+        def write() -> None:
+            with self.transaction() as conn:
+                self._write_history(statement, params, conn)
+
+        with_version_table(self, write)
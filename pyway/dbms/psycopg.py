@@ -0,0 +1,188 @@
+import psycopg
+import psycopg.errors
+from psycopg.conninfo import make_conninfo
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+from pyway.migration import Migration
+from pyway.configfile import ConfigFile
+from pyway.dbms.aio import postgres_pool
+from pyway.dbms.connection import BorrowedConnection, ConnectionSource
+from pyway.dbms.database import (ENSURED_VERSION_TABLES, required_version_table, version_index_name, version_table_key,
+                                 with_version_table)
+from pyway.dbms.postgres import (CREATE_VERSION_MIGRATIONS, CREATE_VERSION_INDEX, DROP_VERSION_INDEX,
+                                 SELECT_VERSION_INDEX_VALID, SELECT_REPLICATION_LAG, SELECT_FIELDS, ORDER_BY_FIELD_ASC,
+                                 INSERT_VERSION_MIGRATE, UPDATE_CHECKSUM)
+from pyway.errors import DUPLICATE_VERSIONS_WARNING
+from pyway.log import logger
+
+# The session connection, opened from the config or borrowed from the application
+SessionConnection = Union[psycopg.Connection, BorrowedConnection]
+
+
+class Psycopg():
+    """PostgreSQL through psycopg 3 (database_type: psycopg).
+
+    The session connection runs in autocommit mode. A migration script is sent as a single
+    simple-protocol message, which PostgreSQL runs as one implicit transaction. History writes
+    are server-side prepared and pipelined together with their BEGIN and COMMIT, so each one
+    costs a single round trip. History rows are fetched in binary format.
+    """
+
+    def __init__(self, args: ConfigFile, connection: Any = None) -> None:
+        self.args = args
+        self.version_table = args.database_table
+        self._connection: Optional[SessionConnection] = None
+        # Connections supplied by an embedding application, see ConnectionSource
+        self._source = ConnectionSource(connection) if connection is not None else None
+        # Same database and table as the psycopg2 adapter, so they share the ensured state
+        self.version_table_key = version_table_key('postgres', args, connection)
+
+    def connect(self) -> SessionConnection:
+        """Return the session connection, opening it on first use"""
+        if self._connection is None or self._connection.closed:
+            self._connection = self._open()
+        return self._connection
+
+    def _open(self) -> SessionConnection:
+        if self._source is not None:
+            conn = self._source.acquire()
+            # Scripts and history reads rely on autocommit, like on connections opened here
+            conn.autocommit = True
+            return conn
+
+        params: Dict[str, Any] = {
+            'dbname': self.args.database_name,
+            'user': self.args.database_username,
+            'host': self.args.database_host,
+        }
+
+        if self.args.database_password:
+            params['password'] = self.args.database_password
+
+        if self.args.database_port:
+            params['port'] = self.args.database_port
+
+        return psycopg.connect(make_conninfo(**params), autocommit=True)
+
+    def disconnect(self) -> None:
+        if self._connection is not None and not self._connection.closed:
+            self._connection.close()
+        self._connection = None
+
+    def create_version_table_if_not_exists(self) -> None:
+        if self.version_table_key in ENSURED_VERSION_TABLES:
+            return
+        self.execute(CREATE_VERSION_MIGRATIONS % self.version_table)
+        self._create_version_index_if_not_exists()
+        ENSURED_VERSION_TABLES.add(self.version_table_key)
+
+    def _create_version_index_if_not_exists(self) -> None:
+        """Add the unique version index, also to tables created by older releases, without blocking writers"""
+        version_table = required_version_table(self.version_table)
+        index = version_index_name(version_table)
+        schema = version_table.rpartition('.')[0]
+        qualified_index = f"{schema}.{index}" if schema else index
+
+        # Autocommit, so CREATE INDEX CONCURRENTLY is not inside a transaction block
+        conn = self.connect()
+        row = conn.execute(SELECT_VERSION_INDEX_VALID, (qualified_index,)).fetchone()
+        if row is not None and row[0]:
+            return
+
+        try:
+            if row is not None:
+                # A previous concurrent build failed and left an invalid index behind
+                conn.execute(DROP_VERSION_INDEX % qualified_index)
+            conn.execute(CREATE_VERSION_INDEX % (index, self.version_table))
+        except psycopg.errors.UniqueViolation:
+            conn.execute(DROP_VERSION_INDEX % qualified_index)
+            logger.warning(DUPLICATE_VERSIONS_WARNING % self.version_table)
+
+    @staticmethod
+    def is_missing_table(error: Exception) -> bool:
+        return isinstance(error, psycopg.errors.UndefinedTable)
+
+    def replication_lag(self) -> Optional[float]:
+        """Seconds this server is behind its primary, None when unknown"""
+        row = self.connect().execute(SELECT_REPLICATION_LAG).fetchone()
+        return float(row[0]) if row is not None and row[0] is not None else None
+
+    def should_close_connection(self) -> bool:
+        """PostgreSQL doesn't close connections after each operation"""
+        return False
+
+    def supports_transactional_ddl(self) -> bool:
+        """PostgreSQL can commit a migration and its history row together"""
+        return True
+
+    def prepare_migrate(self) -> None:
+        """PostgreSQL needs no session changes before applying migrations"""
+
+    @contextmanager
+    def transaction(self) -> Iterator[SessionConnection]:
+        conn = self.connect()
+        with conn.transaction():
+            yield conn
+
+    async def connect_async(self) -> Any:
+        """asyncpg pool handed to async Python migrations with --async-driver"""
+        return await postgres_pool(self.args)
+
+    async def disconnect_async(self, pool: Any) -> None:
+        await pool.close()
+
+    def execute(self, script: str, connection: Optional[SessionConnection] = None) -> None:
+        """Run script in its own transaction, or inside connection's open transaction without committing"""
+        # Without parameters psycopg uses the simple query protocol, so a multi-statement
+        # script travels in one message
+        (connection or self.connect()).execute(script)
+
+    def get_all_schema_migrations(self) -> List[Migration]:
+        conn = self.connect()
+        try:
+            with conn.cursor(binary=True) as cursor:
+                cursor.execute(f"SELECT {','.join(SELECT_FIELDS)} FROM {self.version_table} "
+                               f"ORDER BY {ORDER_BY_FIELD_ASC}")
+                rows = cursor.fetchall()
+        except psycopg.errors.UndefinedTable:
+            # Nothing migrated yet, reads never create the table
+            return []
+        return [Migration(row[0], row[1], row[2], row[3], row[4]) for row in rows]
+
+    def get_schema_migration(self, version: str) -> Migration:
+        conn = self.connect()
+        with conn.cursor(binary=True) as cursor:
+            cursor.execute(f"SELECT {','.join(SELECT_FIELDS)} FROM {self.version_table} WHERE version=%s", [version])
+            row = cursor.fetchone()
+        if row is not None:
+            migration = Migration(row[0], row[1], row[2], row[3], row[4])
+        return migration
+
+    def upgrade_version(self, migration: Migration, connection: Optional[SessionConnection] = None) -> None:
+        self._write_history(INSERT_VERSION_MIGRATE % self.version_table,
+                            (migration.version, migration.extension, migration.name, migration.checksum),
+                            connection)
+
+    def update_checksum(self, migration: Migration) -> None:
+        self._write_history(UPDATE_CHECKSUM % self.version_table, (migration.checksum, migration.version))
+
+    def _write_history(self, statement: str, params: Tuple,
+                       connection: Optional[SessionConnection] = None) -> None:
+        if connection is not None:
+            # Joins the caller's transaction, see with_version_table()
+            connection.execute(statement, params, prepare=True)
+            return
+
+        with_version_table(self, lambda: self._pipelined_write(statement, params))
+
+    def _pipelined_write(self, statement: str, params: Tuple) -> None:
+        conn = self.connect()
+        # BEGIN, the statement and COMMIT are queued and sent together
+        try:
+            with conn.pipeline(), conn.transaction():
+                conn.execute(statement, params, prepare=True)
+        except psycopg.Error:
+            # Leave the session usable for the next statement
+            conn.rollback()
+            raise
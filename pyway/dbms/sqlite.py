@@ -1,8 +1,16 @@
 import sqlite3
-from typing import Any, List, Tuple
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
 
+from pyway.helpers import Utils
 from pyway.migration import Migration
 from pyway.configfile import ConfigFile
+from pyway.dbms.aio import ThreadedConnection
+from pyway.dbms.connection import BorrowedConnection, ConnectionSource
+from pyway.dbms.database import (ENSURED_VERSION_TABLES, required_version_table, version_index_name, version_table_key,
+                                 with_version_table)
+from pyway.errors import DUPLICATE_VERSIONS_WARNING
+from pyway.log import logger
 
 
 CREATE_VERSION_MIGRATIONS = "create table if not exists %s ("\
@@ -13,66 +21,206 @@ CREATE_VERSION_MIGRATIONS = "create table if not exists %s ("\
     "checksum varchar(25) NOT NULL,"\
     "apply_timestamp timestamp DEFAULT CURRENT_TIMESTAMP"\
     ");"
+CREATE_VERSION_INDEX = "create unique index if not exists %s on %s (version);"
 SELECT_FIELDS = ("version", "extension", "name", "checksum", "apply_timestamp")
 ORDER_BY_FIELD_ASC = "installed_rank"
 ORDER_BY_FIELD_DESC = "installed_rank desc"
-INSERT_VERSION_MIGRATE = "insert into %s (version, extension, name, checksum) values ('%s', '%s', '%s', '%s');"
-UPDATE_CHECKSUM = "update %s set checksum='%s' where version='%s';"
+# Only the table name is formatted in, values are bound so the statement text never changes
+INSERT_VERSION_MIGRATE = "insert into %s (version, extension, name, checksum) values (?, ?, ?, ?);"
+UPDATE_CHECKSUM = "update %s set checksum=? where version=?;"
+# Pragmas applied for the lifetime of the connection in bulk mode (cache_size is in KiB when negative)
+BULK_PRAGMAS = {"journal_mode": "WAL", "synchronous": "NORMAL", "cache_size": "-65536"}
+
+# The session connection, opened from the config or borrowed from the application
+SessionConnection = Union[sqlite3.Connection, BorrowedConnection]
 
 
 class Sqlite():
 
-    def __init__(self, config: ConfigFile) -> None:
+    def __init__(self, config: ConfigFile, connection: Any = None) -> None:
         self.config = config
         self.version_table = config.database_table
-        self.create_version_table_if_not_exists()
+        self.bulk_mode = Utils.to_bool(config.database_bulk_mode)
+        self._connection: Optional[SessionConnection] = None
+        self._saved_pragmas: Dict[str, Any] = {}
+        # Set once a migrate run asked for the bulk pragmas, so a reopened connection gets them too
+        self._bulk_active = False
+        # Connections supplied by an embedding application, see ConnectionSource
+        self._source = ConnectionSource(connection) if connection is not None else None
+        self.version_table_key = version_table_key('sqlite', config, connection)
 
     def connect(self) -> Any:
-        conn = sqlite3.connect(self.config.database_name)
-        return conn
+        """Return the connection kept for the whole run, opening it on first use"""
+        if self._connection is not None:
+            try:
+                self._connection.in_transaction
+                return self._connection
+            except sqlite3.ProgrammingError:
+                # Closed by the caller, open a fresh one
+                self._connection = None
+
+        if self._source is not None:
+            self._connection = self._source.acquire()
+            if self._bulk_active:
+                self._apply_bulk_pragmas(self._connection)
+            return self._connection
+
+        # The async path runs database calls on an executor thread, one at a time
+        self._connection = sqlite3.connect(self.config.database_name, check_same_thread=False)
+        if self._bulk_active:
+            self._apply_bulk_pragmas(self._connection)
+        return self._connection
+
+    def disconnect(self) -> None:
+        if self._connection is None:
+            return
+        try:
+            self._connection.commit()
+            self._restore_pragmas(self._connection)
+            self._connection.close()
+        except sqlite3.ProgrammingError:
+            pass
+        self._connection = None
+        self._bulk_active = False
+
+    def prepare_migrate(self) -> None:
+        """Switch to the bulk pragmas for the rest of the session, read-only commands never do"""
+        if not self.bulk_mode or self._bulk_active:
+            return
+        self._apply_bulk_pragmas(self.connect())
+        self._bulk_active = True
+
+    def _apply_bulk_pragmas(self, cnx: SessionConnection) -> None:
+        # A reopened connection keeps the values saved before the first switch
+        if not self._saved_pragmas:
+            self._saved_pragmas = {pragma: cnx.execute(f"PRAGMA {pragma}").fetchone()[0] for pragma in BULK_PRAGMAS}
+        for pragma, value in BULK_PRAGMAS.items():
+            cnx.execute(f"PRAGMA {pragma}={value}")
+
+    def _restore_pragmas(self, cnx: SessionConnection) -> None:
+        # journal_mode is persisted in the database file, the others only matter for symmetry
+        for pragma, value in self._saved_pragmas.items():
+            cnx.execute(f"PRAGMA {pragma}={value}")
+        self._saved_pragmas = {}
 
     def create_version_table_if_not_exists(self) -> None:
-        self.execute(CREATE_VERSION_MIGRATIONS % self.version_table)
+        if self.version_table_key in ENSURED_VERSION_TABLES:
+            return
+        version_table = required_version_table(self.version_table)
+        self.execute(CREATE_VERSION_MIGRATIONS % version_table)
+        try:
+            self.execute(CREATE_VERSION_INDEX % (version_index_name(version_table), version_table))
+        except sqlite3.IntegrityError:
+            logger.warning(DUPLICATE_VERSIONS_WARNING % self.version_table)
+        ENSURED_VERSION_TABLES.add(self.version_table_key)
+
+    @staticmethod
+    def is_missing_table(error: Exception) -> bool:
+        return isinstance(error, sqlite3.OperationalError) and str(error).startswith("no such table")
+
+    def replication_lag(self) -> Optional[float]:
+        """Embedded databases have no replicas"""
+        return 0.0
 
     def should_close_connection(self) -> bool:
-        """SQLite closes connections after each operation"""
+        """SQLite keeps one connection open for the whole run"""
+        return False
+
+    def supports_transactional_ddl(self) -> bool:
+        """SQLite can commit a migration and its history row together"""
         return True
 
-    def execute(self, script: str) -> List[Tuple]:
+    @contextmanager
+    def transaction(self) -> Iterator[SessionConnection]:
+        cnx = self.connect()
+        cnx.execute("BEGIN")
+        try:
+            yield cnx
+            cnx.commit()
+        except Exception:
+            cnx.rollback()
+            raise
+
+    @staticmethod
+    def _split_statements(script: str) -> Iterator[str]:
+        statement = ""
+        for part in script.split(";")[:-1]:
+            statement += part + ";"
+            # A semicolon inside a string, comment or trigger body does not end the statement
+            if sqlite3.complete_statement(statement):
+                yield statement
+                statement = ""
+        statement += script.split(";")[-1]
+        if statement.strip():
+            yield statement
+
+    async def connect_async(self) -> ThreadedConnection:
+        """Thread-backed connection handed to async Python migrations with --async-driver"""
+        return await ThreadedConnection(
+            lambda: sqlite3.connect(self.config.database_name, isolation_level=None)).open()
+
+    async def disconnect_async(self, connection: ThreadedConnection) -> None:
+        await connection.close()
+
+    def execute(self, script: str, connection: Optional[SessionConnection] = None) -> List[Tuple]:
+        """Run script in its own transaction, or inside connection's open transaction without committing"""
+        if connection is not None:
+            # executescript() would commit the open transaction first, so run statements one at a time
+            for statement in self._split_statements(script):
+                connection.execute(statement)
+            return []
         cnx = self.connect()
         cursor = cnx.cursor()
         cursor.executescript(script)
         rows = cursor.fetchall()
         cnx.commit()
-        cnx.close()
+        cursor.close()
         return rows
 
     def get_all_schema_migrations(self) -> List[Migration]:
         cnx = self.connect()
         cursor = cnx.cursor()
-        cursor.execute(f"SELECT {','.join(SELECT_FIELDS)} FROM {self.version_table} ORDER BY {ORDER_BY_FIELD_ASC}")
+        try:
+            cursor.execute(f"SELECT {','.join(SELECT_FIELDS)} FROM {self.version_table} ORDER BY {ORDER_BY_FIELD_ASC}")
+        except sqlite3.OperationalError as error:
+            # Nothing migrated yet, reads never create the table
+            cursor.close()
+            if self.is_missing_table(error):
+                return []
+            raise
         migrations = []
         for row in cursor.fetchall():
             migrations.append(Migration(row[0], row[1], row[2], row[3], row[4]))
         cursor.close()
-        cnx.close()
         return migrations
 
     def get_schema_migration(self, version: str) -> Migration:
         cnx = self.connect()
         cursor = cnx.cursor()
-        cursor.execute(f"SELECT {','.join(SELECT_FIELDS)} FROM {self.version_table} WHERE version='{version}'")
+        cursor.execute(f"SELECT {','.join(SELECT_FIELDS)} FROM {self.version_table} WHERE version=?", [version])
         row = cursor.fetchone()
         if row is not None:
             migration = Migration(row[0], row[1], row[2], row[3], row[4])
         cursor.close()
-        cnx.close()
         return migration
 
-    def upgrade_version(self, migration: Migration) -> None:
-        self.execute(INSERT_VERSION_MIGRATE % (self.version_table, migration.version,
-                                               migration.extension, migration.name,
-                                               migration.checksum))
+    def upgrade_version(self, migration: Migration, connection: Optional[SessionConnection] = None) -> None:
+        self._write_history(INSERT_VERSION_MIGRATE % self.version_table,
+                            (migration.version, migration.extension, migration.name, migration.checksum),
+                            connection)
 
     def update_checksum(self, migration: Migration) -> None:
-        self.execute(UPDATE_CHECKSUM % (self.version_table, migration.checksum, migration.version))
+        self._write_history(UPDATE_CHECKSUM % self.version_table, (migration.checksum, migration.version))
+
+    def _write_history(self, statement: str, params: Tuple,
+                       connection: Optional[SessionConnection] = None) -> None:
+        if connection is not None:
+            # Joins the caller's transaction, see with_version_table()
+            connection.execute(statement, params)
+            return
+
+        def write() -> None:
+            with self.transaction() as cnx:
+                self._write_history(statement, params, cnx)
+
+        with_version_table(self, write)
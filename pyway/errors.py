@@ -8,3 +8,14 @@ DIRECTORY_NOT_FOUND: str = "ERROR: directory not found ('%s')"
 MIGRATIONS_MISSING: str = "ERROR: Missing local migration file (%s)"
 MIGRATIONS_NOT_FOUND: str = "ERROR: no local migration files found in (%s) folder"
 MIGRATIONS_NOT_STARTED: str = "ERROR: no migrations applied yet, no validation necessary."
+REPLICA_LAG_WARNING: str = "WARNING: replica (%s) is %s seconds behind (max %s), using the primary"
+REPLICA_UNAVAILABLE_WARNING: str = "WARNING: replica (%s) unavailable (%s), using the primary"
+DUPLICATE_VERSIONS_WARNING: str = "WARNING: history table (%s) has duplicate versions, unique version index not created"
+UNKNOWN_DRIVER_ERROR: str = "ERROR: unknown database driver (%s) - expected: %s"
+DRIVER_POOL_ERROR: str = "ERROR: database driver (%s) does not support connection pooling"
+UNKNOWN_CHECKSUM_ALGORITHM_ERROR: str = "ERROR: unknown checksum algorithm (%s) - expected: %s"
+UNKNOWN_CHECKSUM_TAG_ERROR: str = "ERROR: checksum (%s) was computed with an unknown algorithm"
+INDEX_UNREADABLE_WARNING: str = "WARNING: migration index (%s) ignored (%s) - run `pyway index` again"
+DUPLICATE_VERSION_ERROR: str = "ERROR: migration version %s found twice (%s and %s)"
+INDEX_LOCATIONS_ERROR: str = "ERROR: index needs a single migration directory without recursion or patterns"
+VERSION_TABLE_MISSING_ERROR: str = "ERROR: no history table configured (database_table)"
@@ -0,0 +1,72 @@
+"""Checksum algorithms for migration files.
+
+CRC32 checksums are stored as bare hex, like in every earlier release. The other
+algorithms store a two letter tag, a colon and a 128-bit digest in unpadded base64url,
+25 characters in all, which fits the varchar(25) checksum column of the history table.
+The tag tells which algorithm to validate a row with, so rows of different algorithms
+can live in the same table.
+"""
+import base64
+import hashlib
+import importlib
+import zlib
+from typing import Any, Callable, Dict, Optional
+
+from pyway.errors import UNKNOWN_CHECKSUM_ALGORITHM_ERROR, UNKNOWN_CHECKSUM_TAG_ERROR
+
+DEFAULT_ALGORITHM = "crc32"
+DIGEST_SIZE = 16
+
+
+class Crc32():
+    """zlib.crc32 behind the update() interface of hashlib"""
+
+    def __init__(self) -> None:
+        self.value = 0
+
+    def update(self, data: Any) -> None:
+        self.value = zlib.crc32(data, self.value)
+
+
+class Algorithm():
+    def __init__(self, name: str, tag: Optional[str], new: Callable[[], Any]) -> None:
+        self.name = name
+        self.tag = tag
+        self.new = new
+
+    def encode(self, hasher: Any) -> str:
+        if self.tag is None:
+            return "%X" % (hasher.value & 0xFFFFFFFF)
+        digest = base64.urlsafe_b64encode(hasher.digest()[:DIGEST_SIZE]).decode("ascii").rstrip("=")
+        return f"{self.tag}:{digest}"
+
+
+def _xxh3() -> Any:
+    # xxhash is an optional dependency, only imported when selected
+    return importlib.import_module("xxhash").xxh3_128()
+
+
+ALGORITHMS: Dict[str, Algorithm] = {algorithm.name: algorithm for algorithm in (
+    Algorithm("crc32", None, Crc32),
+    Algorithm("blake2b", "b2", lambda: hashlib.blake2b(digest_size=DIGEST_SIZE)),
+    Algorithm("sha256", "s2", hashlib.sha256),
+    Algorithm("xxh3", "x3", _xxh3),
+)}
+
+
+def get_algorithm(name: Optional[str]) -> Algorithm:
+    algorithm = ALGORITHMS.get((name or DEFAULT_ALGORITHM).lower())
+    if algorithm is None:
+        raise RuntimeError(UNKNOWN_CHECKSUM_ALGORITHM_ERROR % (name, "|".join(ALGORITHMS)))
+    return algorithm
+
+
+def algorithm_of(checksum: str) -> str:
+    """Name of the algorithm a stored checksum was computed with"""
+    tag, separator, _ = checksum.partition(":")
+    if not separator:
+        return DEFAULT_ALGORITHM
+    for algorithm in ALGORITHMS.values():
+        if algorithm.tag == tag:
+            return algorithm.name
+    raise RuntimeError(UNKNOWN_CHECKSUM_TAG_ERROR % checksum)
@@ -1,10 +1,15 @@
+import functools
 import os
 import re
-import zlib
+import tempfile
 from typing import Any, Dict, List, Iterable, Tuple
 
 from pyway import settings
 from pyway.errors import VALID_NAME_ERROR, DIRECTORY_NOT_FOUND, OUT_OF_DATE_ERROR
+from pyway.hashing import DEFAULT_ALGORITHM, get_algorithm
+
+# Checksums are computed over buffers this large, zlib and hashlib release the GIL while hashing each one
+CHECKSUM_CHUNK_SIZE = 1024 * 1024
 
 
 class bcolors():
@@ -18,19 +23,124 @@ class bcolors():
     UNDERLINE = '\033[4m'
 
 
+class FileAnalysis():
+    """What one pass over a migration file's bytes tells about it"""
+
+    def __init__(self, checksum: str, size: int, crlf: bool, algorithm: str = DEFAULT_ALGORITHM) -> None:
+        self.checksum = checksum
+        self.size = size
+        # DOS line breaks, the usual reason a checksum differs from the one applied
+        self.crlf = crlf
+        self.algorithm = algorithm
+
+    @classmethod
+    def of_bytes(cls, content: bytes, algorithm: str = DEFAULT_ALGORITHM) -> 'FileAnalysis':
+        hashing = get_algorithm(algorithm)
+        hasher = hashing.new()
+        hasher.update(content)
+        return cls(hashing.encode(hasher), len(content), b"\r\n" in content, hashing.name)
+
+
+class LocalFile():
+    """A migration file found by the directory scan, with the stat data of its directory entry
+
+    os.scandir() takes the file type from the directory listing, so the scan itself stats
+    nothing. stat() runs at most once per file (never on Windows, where the listing has it)
+    and every later stage reuses the result.
+    """
+
+    def __init__(self, entry: 'os.DirEntry[str]', directory: str) -> None:
+        self.name = entry.name
+        self.path = entry.path
+        # As configured, relative to the working directory unless given as an absolute path
+        self.directory = directory
+        self._entry = entry
+
+    def stat(self) -> os.stat_result:
+        return self._entry.stat()
+
+    @property
+    def size(self) -> int:
+        return self.stat().st_size
+
+    @property
+    def mtime_ns(self) -> int:
+        return self.stat().st_mtime_ns
+
+    @property
+    def inode(self) -> int:
+        return self._entry.inode()
+
+
+class ParsedName():
+    """Version, description and extension of a migration file name"""
+
+    def __init__(self, version: str, description: str, extension: str) -> None:
+        self.version = version
+        self.description = description
+        self.extension = extension
+
+    @property
+    def version_key(self) -> Tuple[int, ...]:
+        return Utils._version_sort_key(self.version)
+
+
+class MigrationNameParser():
+    """Migration file names, matched against patterns compiled once per prefix, separator and suffixes"""
+
+    def __init__(self, prefix: str, separator: str, suffixes: str) -> None:
+        template = r"^%s\d+(?:[._]\d+)*%s([A-Za-z0-9_]+(?:%s[A-Za-z0-9_]+)*)(\%s|\.py)$"
+        self._valid = re.compile(template % (re.escape(prefix), re.escape(separator), re.escape(separator), suffixes),
+                                 re.IGNORECASE)
+        self._name = re.compile(rf"^{re.escape(prefix)}([\d._]+){re.escape(separator)}(.*)", re.DOTALL)
+
+    @staticmethod
+    def current() -> 'MigrationNameParser':
+        """Parser for the naming settings in effect"""
+        return _name_parser(settings.SQL_MIGRATION_PREFIX, settings.SQL_MIGRATION_SEPARATOR,
+                            settings.SQL_MIGRATION_SUFFIXES)
+
+    def is_valid(self, name: str) -> bool:
+        return self._valid.fullmatch(name) is not None
+
+    def parse(self, name: str) -> ParsedName:
+        """Split a name with a single match, only its prefix, version and separator are checked"""
+        match = self._name.match(name)
+        if not match:
+            raise ValueError(VALID_NAME_ERROR % (name, Utils.expected_pattern()))
+
+        # Normalize separators: replace _ with .
+        version = match.group(1).replace("_", ".")
+        description, dot, extension = match.group(2).rpartition(".")
+        return ParsedName(version, description, (extension if dot else name.split('.')[-1]).upper())
+
+
+@functools.lru_cache(maxsize=8)
+def _name_parser(prefix: str, separator: str, suffixes: str) -> MigrationNameParser:
+    return MigrationNameParser(prefix, separator, suffixes)
+
+
 class Utils():
 
     @staticmethod
     def _version_sort_key(version: str) -> Tuple[int, ...]:
         """Convert version string to tuple of ints for correct numeric sorting."""
-        return tuple(int(c) for c in version.replace("_", ".").split("."))
+        return tuple(map(int, version.replace("_", ".").split(".")))
+
+    @staticmethod
+    def version_key(migration: Any) -> Tuple[int, ...]:
+        """Sort key of a migration, Migration objects parse it once and keep it"""
+        if isinstance(migration, dict):
+            return Utils._version_sort_key(migration.get("version", ""))
+        key = getattr(migration, "version_key", None)
+        return key if key is not None else Utils._version_sort_key(migration.version)
 
     @staticmethod
     def subtract(list_a: List, list_b: List) -> List:
         result = []
         if list_a and list_b:
-            version_set_b = {Utils._version_sort_key(b.version) for b in list_b}
-            result = [a for a in list_a if Utils._version_sort_key(a.version) not in version_set_b]
+            version_set_b = {Utils.version_key(b) for b in list_b}
+            result = [a for a in list_a if Utils.version_key(a) not in version_set_b]
         elif list_a and not list_b:
             # List B is empty (usually from a new install)
             return list_a
@@ -43,25 +153,13 @@ class Utils():
 
     @staticmethod
     def is_file_name_valid(name: str) -> bool:
-        template = r"^%s\d+(?:[._]\d+)*%s([A-Za-z0-9_]+(?:%s[A-Za-z0-9_]+)*)(\%s|\.py)$"
-        _pattern = template % (
-            re.escape(settings.SQL_MIGRATION_PREFIX),
-            re.escape(settings.SQL_MIGRATION_SEPARATOR),
-            re.escape(settings.SQL_MIGRATION_SEPARATOR),
-            settings.SQL_MIGRATION_SUFFIXES
-        )
-        return re.fullmatch(_pattern, name, re.IGNORECASE) is not None
+        return MigrationNameParser.current().is_valid(name)
 
     @staticmethod
     def sort_migrations_list(migrations: List[Any]) -> List[Any]:
         def sort_key(x: Any) -> Tuple[Tuple[int, ...], str]:
-            if isinstance(x, dict):
-                version = x.get("version", "")
-                name = x.get("name", "")
-            else:
-                version = x.version
-                name = x.name
-            return (Utils._version_sort_key(version), name)
+            name = x.get("name", "") if isinstance(x, dict) else x.name
+            return (Utils.version_key(x), name)
         return sorted(migrations, key=sort_key)
 
     @staticmethod
@@ -75,32 +173,46 @@ class Utils():
 
     @staticmethod
     def get_version_from_name(name: str) -> str:
-        pattern = rf"^{re.escape(settings.SQL_MIGRATION_PREFIX)}([\d._]+){re.escape(settings.SQL_MIGRATION_SEPARATOR)}"
-        match = re.match(pattern, name)
-
-        if not match:
-            raise ValueError(VALID_NAME_ERROR % (name, Utils.expected_pattern()))
-
-        version_part = match.group(1)
-        # Normalize separators: replace _ with .
-        version = version_part.replace("_", ".")
-
-        return version
+        return MigrationNameParser.current().parse(name).version
 
     @staticmethod
     def get_extension_from_name(name: str) -> str:
         return name.split('.')[-1].upper()
 
     @staticmethod
-    def load_checksum_from_name(name: str, path: str) -> str:
+    def load_checksum_from_name(name: str, path: str, algorithm: str = DEFAULT_ALGORITHM) -> str:
+        return Utils.analyze_file(name, path, algorithm).checksum
+
+    @staticmethod
+    def analyze_file(name: str, path: str, algorithm: str = DEFAULT_ALGORITHM) -> 'FileAnalysis':
+        """Checksum, size and line ending style of a migration file in one chunked pass
+
+        The chunks are read into one reused buffer. Every algorithm is streamed, so the CRC32
+        checksum equals the value built line by line in earlier releases.
+        """
         fullname = os.path.join(os.getcwd(), path, name)
-        prev = 0
+        hashing = get_algorithm(algorithm)
+        hasher = hashing.new()
+        size = 0
+        crlf = False
+        last = b""
+        buffer = bytearray(CHECKSUM_CHUNK_SIZE)
+        view = memoryview(buffer)
         try:
-            for line in open(fullname, "rb"):
-                prev = zlib.crc32(line, prev)
-            return "%X" % (prev & 0xFFFFFFFF)
+            with open(fullname, "rb", buffering=0) as file:
+                while True:
+                    read = file.readinto(buffer)  # type: ignore[attr-defined]
+                    if not read:
+                        break
+                    chunk = view[:read]
+                    hasher.update(chunk)
+                    size += read
+                    # A CRLF pair can straddle two chunks
+                    crlf = crlf or (last == b"\r" and buffer[0] == 0x0A) or buffer.find(b"\r\n", 0, read) != -1
+                    last = bytes(chunk[-1:])
         except FileNotFoundError:
             raise FileNotFoundError(OUT_OF_DATE_ERROR % fullname.split("/")[-1])
+        return FileAnalysis(hashing.encode(hasher), size, crlf, hashing.name)
 
     @staticmethod
     def basepath(d: str) -> str:
@@ -108,21 +220,41 @@ class Utils():
 
     @staticmethod
     def get_local_files(d: str) -> List[str]:
+        return [local_file.name for local_file in Utils.scan_local_files(d)]
+
+    @staticmethod
+    def scan_local_files(d: str) -> List[LocalFile]:
         path = Utils.basepath(d)
-        dir_list = []
         try:
-            # Skip any hidden files and directories
-            for f in os.listdir(path):
-                full_path = os.path.join(path, f)
-                if not f.startswith('.') and os.path.isfile(full_path):
-                    dir_list.append(f)
+            with os.scandir(path) as entries:
+                # Skip any hidden files and directories
+                return [LocalFile(entry, d) for entry in entries if not entry.name.startswith('.') and entry.is_file()]
         except OSError:
             raise FileNotFoundError(DIRECTORY_NOT_FOUND % path)
-        return dir_list
+
+    @staticmethod
+    def replace_file(path: str, content: str) -> None:
+        """Write content to path through a temporary file and os.replace(), so readers see
+        either the old or the new file, never a partial one
+
+        The file gets the mode open() would give it. mkstemp() creates 0600 files, which other
+        users, e.g. the runtime user of an image built as root, couldn't read.
+        """
+        descriptor, temporary = tempfile.mkstemp(prefix=os.path.basename(path), dir=os.path.dirname(path))
+        try:
+            with os.fdopen(descriptor, "w", encoding="utf-8") as new_file:
+                new_file.write(content)
+            umask = os.umask(0)
+            os.umask(umask)
+            os.chmod(temporary, 0o666 & ~umask)
+            os.replace(temporary, path)
+        except BaseException:
+            os.unlink(temporary)
+            raise
 
     @staticmethod
     def create_map_from_list(key: str, list_: List[Any]) -> Dict[Any, Any]:
-        return {lst.__dict__[key]: lst for lst in list_}
+        return {getattr(lst, key): lst for lst in list_}
 
     @staticmethod
     def color(msg: str, color: str) -> str:
@@ -139,6 +271,13 @@ class Utils():
             raise KeyError(f"Missing configuration options: {', '.join(missing_keys)}")
         return True
 
+    @staticmethod
+    def to_bool(value: Any) -> bool:
+        """Interpret flags coming from the command line, env variables or the config file"""
+        if isinstance(value, str):
+            return value.strip().lower() in ("1", "true", "yes", "on")
+        return bool(value)
+
     @staticmethod
     def format_version(version: str) -> str:
         """Normalize version string (replace _ with .)."""
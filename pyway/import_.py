@@ -1,16 +1,19 @@
 import os
+from typing import Any
 
 from pyway.migration import Migration
 from pyway.dbms.database import factory
+from pyway.hashing import get_algorithm
 from pyway.helpers import Utils
 from pyway.errors import VALID_NAME_ERROR
 from pyway.configfile import ConfigFile
+from pyway.sources import MigrationSources
 
 
 class Import():
 
-    def __init__(self, args: ConfigFile) -> None:
-        self._db = factory(args.database_type)(args)
+    def __init__(self, args: ConfigFile, db: Any = None) -> None:
+        self._db = db if db is not None else factory(args.database_type)(args)
         self.migration_dir = args.database_migration_dir
         self.schema_file = args.schema_file
         self.args = args
@@ -19,18 +22,20 @@ class Import():
         if not self.schema_file:
             raise AttributeError("Error, must specify --schema-file with import")
 
-        # If a path is specified, strip that off - all files should
-        # be in the migration_dir directory
+        # If a path is specified, strip that off - files are looked
+        # up by name in the migration directories
         if os.path.isabs(self.schema_file) or os.sep in self.schema_file:
             self.schema_file = os.path.basename(self.schema_file)
 
-        if not os.path.exists(os.path.join(os.getcwd(), self.migration_dir, self.schema_file)):
+        directory = MigrationSources.from_config(self.args).find(self.schema_file)
+        if directory is None:
             raise FileNotFoundError(f"Error, schema file '{self.migration_dir}/{self.schema_file}' does not exist!")
 
         if not Utils.is_file_name_valid(self.schema_file):
             raise ValueError(VALID_NAME_ERROR % (self.schema_file, Utils.expected_pattern()))
 
         # File exists, import it
-        migration = Migration.from_name(self.schema_file, self.migration_dir)
+        migration = Migration.from_name(self.schema_file, directory,
+                                        get_algorithm(self.args.checksum_algorithm).name)
         self._db.upgrade_version(migration)
         return (migration.name)
@@ -0,0 +1,37 @@
+from typing import Tuple
+
+from pyway.cache import ChecksumCache
+from pyway.catalog import load_checksums
+from pyway.configfile import ConfigFile
+from pyway.errors import INDEX_LOCATIONS_ERROR
+from pyway.hashing import get_algorithm
+from pyway.helpers import Utils
+from pyway.manifest import write_manifest
+from pyway.migration import Migration
+from pyway.sources import MigrationSources
+
+
+class Index():
+    """Write the .pyway-index manifest, so later commands read one file instead of scanning the directory"""
+
+    def __init__(self, args: ConfigFile) -> None:
+        self.migration_dir: str = args.database_migration_dir or 'resources'
+        self.algorithm = get_algorithm(args.checksum_algorithm).name
+        self.checksum_workers = int(args.checksum_workers) if args.checksum_workers else None
+        self.checksum_cache = Utils.to_bool(args.checksum_cache)
+        self.args = args
+
+    def run(self) -> Tuple[str, int]:
+        # The manifest is checked against its directory's mtime, which doesn't cover other locations
+        if not MigrationSources.from_config(self.args).flat:
+            raise ValueError(INDEX_LOCATIONS_ERROR)
+
+        # Always a fresh scan, an existing manifest is what gets replaced
+        local_files = Utils.scan_local_files(self.migration_dir)
+        migrations = Utils.sort_migrations_list([
+            Migration.from_name(local_file.name, self.migration_dir, self.algorithm, local_file)
+            for local_file in local_files
+        ])
+        cache = ChecksumCache(self.migration_dir) if self.checksum_cache else None
+        load_checksums(migrations, self.checksum_workers, cache)
+        return write_manifest(self.migration_dir, migrations), len(migrations)
@@ -1,21 +1,23 @@
-import os
 from tabulate import tabulate
-from typing import List
+from typing import Any, List, Optional
 
+from pyway.catalog import local_file_names
 from pyway.helpers import Utils
 from pyway.log import bcolors
 from pyway.migration import Migration
 from pyway.dbms.database import factory
 from pyway.configfile import ConfigFile
+from pyway.sources import MigrationSources
 from pyway.errors import (MIGRATIONS_MISSING)
 
 
 class Info():
-    def __init__(self, config: ConfigFile) -> None:
+    def __init__(self, config: ConfigFile, db: Any = None) -> None:
         self.migration_dir = config.database_migration_dir
-        self._db = factory(config.database_type)(config)
+        self._db = db if db is not None else factory(config.database_type)(config)
         self.headers = ["version", "extension", "name", "checksum", "apply_timestamp"]
         self.tablefmt = "psql"
+        self.sources = MigrationSources.from_config(config)
         self.config = config
 
     def run(self) -> str:
@@ -30,22 +32,33 @@ class Info():
     def get_table_info(self) -> List:
         # Get remote migrations (and validate that the files exist)
         db_migrations = self._db.get_all_schema_migrations()
+        # One scan of the directory answers for every history row
+        try:
+            local_files = local_file_names(self.sources)
+        except FileNotFoundError:
+            if db_migrations:
+                raise RuntimeError(MIGRATIONS_MISSING % db_migrations[0].name)
+            raise
+        local_names = set(local_files)
         for m in db_migrations:
-            if not os.path.exists(os.path.join(self.config.database_migration_dir, m.name)):
+            if m.name not in local_names:
                 raise RuntimeError(MIGRATIONS_MISSING % m.name)
 
         # Get any new local migrations
-        local_migrations = self.get_new_local_migrations(db_migrations, self.migration_dir)
+        local_migrations = self.get_new_local_migrations(db_migrations, self.migration_dir, local_files)
 
         return db_migrations + local_migrations
 
-    def get_new_local_migrations(self, db_migrations: List, migration_dir: str) -> List:
-        local_files = Utils.get_local_files(migration_dir)
+    def get_new_local_migrations(self, db_migrations: List, migration_dir: str,
+                                 local_files: Optional[List[str]] = None) -> List:
+        if local_files is None:
+            local_files = local_file_names(MigrationSources.from_config(self.config, migration_dir))
         if not local_files:
             return []
 
+        applied = {db_migration.name for db_migration in db_migrations}
         new_local_migrations = [self.structure_migration(local_file) for local_file in local_files
-                                if local_file not in [db_migration.name for db_migration in db_migrations]]
+                                if local_file not in applied]
 
         return Utils.sort_migrations_list(new_local_migrations)
 
@@ -19,6 +19,10 @@ class _Log():
         if self.logger:
             self.logger.info(Utils.color(msg, bcolors.OKBLUE))
 
+    def warning(self, msg: str) -> None:
+        if self.logger:
+            self.logger.warning(Utils.color(msg, bcolors.WARNING))
+
     def error(self, msg: str) -> None:
         if self.logger:
             self.logger.error(Utils.color(msg, bcolors.FAIL))
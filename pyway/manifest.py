@@ -0,0 +1,60 @@
+import json
+import os
+from typing import Dict, List, Optional
+
+from pyway.errors import INDEX_UNREADABLE_WARNING
+from pyway.hashing import algorithm_of
+from pyway.helpers import LocalFile, Utils
+from pyway.log import logger
+from pyway.migration import Migration
+
+MANIFEST_FILE = ".pyway-index"
+MANIFEST_FORMAT = 1
+
+
+def write_manifest(migration_dir: str, migrations: List[Migration]) -> str:
+    """Write .pyway-index for the migrations of migration_dir, which must all have their checksums"""
+    directory = Utils.basepath(migration_dir)
+    path = os.path.join(directory, MANIFEST_FILE)
+    entries = []
+    for migration in migrations:
+        stat = migration.local_file.stat() if migration.local_file is not None else \
+            os.stat(os.path.join(directory, migration.name))
+        entries.append([migration.name, migration.version, migration.extension,
+                        stat.st_size, stat.st_mtime_ns, migration.checksum])
+
+    Utils.replace_file(path, json.dumps({"format": MANIFEST_FORMAT, "entries": entries}))
+    return path
+
+
+def load_manifest(migration_dir: str) -> Dict[str, List]:
+    """Entries of .pyway-index by file name, empty when there is none or it can't be read"""
+    path = os.path.join(Utils.basepath(migration_dir), MANIFEST_FILE)
+    try:
+        with open(path, "r", encoding="utf-8") as manifest_file:
+            content = json.load(manifest_file)
+        if content.get("format") != MANIFEST_FORMAT:
+            raise ValueError(f"unknown format {content.get('format')}")
+        return {entry[0]: entry for entry in content["entries"]}
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError, KeyError, TypeError, AttributeError, IndexError) as error:
+        logger.warning(INDEX_UNREADABLE_WARNING % (path, error))
+        return {}
+
+
+def indexed_migration(entry: List, local_file: LocalFile, migration_dir: str) -> Optional[Migration]:
+    """Migration from its manifest entry, None when the file's size or mtime changed since it was indexed
+
+    The stat data comes from the directory scan, so a file edited in place is never trusted
+    and nothing is read to find out.
+    """
+    name, version, extension, size, mtime_ns, checksum = entry
+    if (local_file.size, local_file.mtime_ns) != (size, mtime_ns):
+        return None
+    try:
+        algorithm = algorithm_of(checksum)
+    except RuntimeError:
+        # Written with an algorithm this release doesn't know, the file is read instead
+        return None
+    return Migration(version, extension, name, checksum, None, migration_dir, algorithm, local_file)
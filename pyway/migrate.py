@@ -3,22 +3,31 @@ import sys
 import importlib.util
 import asyncio
 import inspect
-from typing import List, Any
+from concurrent.futures import Executor, ThreadPoolExecutor
+from contextlib import nullcontext
+from typing import Callable, ContextManager, List, Any, Optional
 
-from pyway.helpers import Utils
+from pyway.helpers import FileAnalysis, Utils
 from pyway.migration import Migration
-from pyway.dbms.database import factory
+from pyway.dbms.database import factory, missing_version_table, recreate_version_table, with_version_table
 from pyway.errors import MIGRATIONS_NOT_FOUND
 from pyway.helpers import bcolors
 from pyway.configfile import ConfigFile
+from pyway.plan import Plan
 
 
 class Migrate():
 
-    def __init__(self, args: ConfigFile) -> None:
-        self._db = factory(args.database_type)(args)
+    def __init__(self, args: ConfigFile, db: Any = None, plan: Optional[Plan] = None,
+                 executor: Optional[Executor] = None) -> None:
+        if plan is not None:
+            db = plan.db
+        self._db = db if db is not None else factory(args.database_type)(args)
+        self.plan = plan if plan is not None else Plan(args, self._db)
         self.migration_dir = args.database_migration_dir
         self.args = args
+        # Runs the blocking calls of run_async(), a private single thread when not given
+        self._executor = executor
 
     def run(self) -> str:
         output = ''
@@ -27,67 +36,164 @@ class Migrate():
             output += Utils.color("Nothing to do\n", bcolors.FAIL)
             return output
 
+        self._db.prepare_migrate()
+        # Make sure the history can be recorded before changing anything
+        self._db.create_version_table_if_not_exists()
+
         for migration in migrations_to_be_executed:
             output += Utils.color(f"Migrating --> {migration.name}\n", bcolors.OKBLUE)
             try:
-                if migration.extension.upper() == 'PY':
-                    self.args.prepare_for_python_migrations()
-                    self._execute_python_migration(migration)
-                else:
-                    # Treat all other extensions as SQL migrations
-                    self._execute_sql_migration(migration)
-                self._db.upgrade_version(migration)
+                with self._environment(migration):
+                    if self._atomic():
+                        self._execute_atomic_migration(migration)
+                    elif migration.extension.upper() == 'PY':
+                        self._execute_python_migration(migration)
+                        self._db.upgrade_version(migration)
+                    else:
+                        # Treat all other extensions as SQL migrations
+                        self._execute_sql_migration(migration)
+                        self._db.upgrade_version(migration)
+                self.plan.record(migration)
                 output += Utils.color(f"{migration.name} SUCCESS\n", bcolors.OKBLUE)
             except Exception as error:
                 raise RuntimeError(f"Migration {migration.name} failed: {error}")
         return output
 
     async def run_async(self) -> str:
-        """Async version of run() method"""
+        """Async version of run() method
+
+        Every blocking call runs on the executor, so the event loop stays responsive
+        while scripts and history writes are in flight.
+        """
+        if self._executor is not None:
+            return await self._run_async()
+
+        # One thread keeps database calls in order on connections that are not shared safely
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pyway-migrate")
+        self._executor = executor
+        try:
+            return await self._run_async()
+        finally:
+            self._executor = None
+            executor.shutdown(wait=False)
+
+    async def _run_async(self) -> str:
         output = ''
-        migrations_to_be_executed = self._get_migration_files_to_be_executed()
+        migrations_to_be_executed = await self._offload(self._get_migration_files_to_be_executed)
         if not migrations_to_be_executed:
             output += Utils.color("Nothing to do\n", bcolors.FAIL)
             return output
 
+        await self._offload(self._db.prepare_migrate)
+        # Make sure the history can be recorded before changing anything
+        await self._offload(self._db.create_version_table_if_not_exists)
+
         for migration in migrations_to_be_executed:
             output += Utils.color(f"Migrating --> {migration.name}\n", bcolors.OKBLUE)
             try:
-                if migration.extension.upper() == 'PY':
-                    self.args.prepare_for_python_migrations()
-                    await self._execute_python_migration_async(migration)
-                else:
-                    # SQL migrations remain synchronous
-                    self._execute_sql_migration(migration)
-                self._db.upgrade_version(migration)
+                with self._environment(migration):
+                    if self._atomic():
+                        await self._execute_atomic_migration_async(migration)
+                    elif migration.extension.upper() == 'PY':
+                        await self._execute_python_migration_async(migration)
+                        await self._offload(self._db.upgrade_version, migration)
+                    else:
+                        await self._offload(self._execute_sql_migration, migration)
+                        await self._offload(self._db.upgrade_version, migration)
+                self.plan.record(migration)
                 output += Utils.color(f"{migration.name} SUCCESS\n", bcolors.OKBLUE)
             except Exception as error:
                 raise RuntimeError(f"Migration {migration.name} failed: {error}")
         return output
 
-    def _get_migration_files_to_be_executed(self) -> List:
-        all_local_migrations = self._get_all_local_migrations()
-        all_db_migrations = Migration.from_list(self._db.get_all_schema_migrations())
+    async def _offload(self, function: Callable, *args: Any) -> Any:
+        """Run a blocking call on the executor"""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, function, *args)
 
-        if all_db_migrations and not all_local_migrations:
+    def _get_migration_files_to_be_executed(self) -> List:
+        if self.plan.db_migrations and not self.plan.local_migrations:
             raise RuntimeError(MIGRATIONS_NOT_FOUND % self.migration_dir)
-        return Utils.subtract(all_local_migrations, all_db_migrations)
+        return self.plan.pending_migrations()
+
+    def _environment(self, migration: Migration) -> ContextManager:
+        """Connection settings exported to the environment for the duration of a Python migration"""
+        if migration.extension.upper() == 'PY':
+            return self.args.python_migration_environment()
+        return nullcontext()
+
+    def _atomic(self) -> bool:
+        return bool(self.args.atomic_mode) and self._db.supports_transactional_ddl()
+
+    def _execute_atomic_migration(self, migration: Migration) -> None:
+        """Apply a migration and insert its history row in one transaction
+
+        When the history table has gone missing in the meantime the transaction is rolled back,
+        so it runs again once the table is recreated, see with_version_table().
+        """
+        def apply() -> None:
+            with self._db.transaction() as connection:
+                if migration.extension.upper() == 'PY':
+                    self._execute_python_migration(migration, connection)
+                else:
+                    self._db.execute(self._read_sql_migration(migration), connection)
+                self._db.upgrade_version(migration, connection)
+
+        with_version_table(self._db, apply)
+
+    async def _execute_atomic_migration_async(self, migration: Migration) -> None:
+        """Async version of _execute_atomic_migration()"""
+        if migration.extension.upper() != 'PY':
+            await self._offload(self._execute_atomic_migration, migration)
+            return
+
+        await self._offload(self._db.create_version_table_if_not_exists)
+        try:
+            await self._apply_atomic_python_migration_async(migration)
+        except Exception as error:
+            if not missing_version_table(self._db, error):
+                raise
+            await self._offload(recreate_version_table, self._db)
+            await self._apply_atomic_python_migration_async(migration)
+
+    async def _apply_atomic_python_migration_async(self, migration: Migration) -> None:
+        # Entered and left on the executor, the migration itself runs on the event loop
+        transaction = self._db.transaction()
+        connection = await self._offload(transaction.__enter__)
+        try:
+            await self._execute_python_migration_async(migration, connection)
+            await self._offload(self._db.upgrade_version, migration, connection)
+        except BaseException as error:
+            if not await self._offload(transaction.__exit__, type(error), error, error.__traceback__):
+                raise
+        else:
+            await self._offload(transaction.__exit__, None, None, None)
+
+    def _directory(self, migration: Migration) -> str:
+        """Directory the migration file was found in, one of several locations or a subdirectory"""
+        return migration.path if migration.path is not None else self.migration_dir
 
-    def _get_all_local_migrations(self) -> List:
-        local_files = Utils.get_local_files(self.migration_dir)
-        if not local_files:
-            return []
-        migrations = [Migration.from_name(local_file, self.migration_dir) for local_file in local_files]
-        return Utils.sort_migrations_list(migrations)
+    def _read_sql_migration(self, migration: Migration) -> str:
+        """Script of a migration, the checksum recorded for it comes from the same read"""
+        with open(os.path.join(os.getcwd(), self._directory(migration), migration.name), "rb") as sqlfile:
+            content = sqlfile.read()
+        migration.analysis = FileAnalysis.of_bytes(content, migration.algorithm)
+        migration.checksum = migration.analysis.checksum
+        # Same newline translation as reading in text mode
+        return content.decode('utf-8').replace('\r\n', '\n').replace('\r', '\n')
 
     def _execute_sql_migration(self, migration: Migration) -> None:
         """Execute SQL migration file"""
-        with open(os.path.join(os.getcwd(), self.migration_dir, migration.name), "r", encoding='utf-8') as sqlfile:
-            self._db.execute(sqlfile.read())
+        self._db.execute(self._read_sql_migration(migration))
 
     def _load_python_module(self, migration: Migration) -> Any:
-        """Load and validate Python migration module"""
-        migration_path = os.path.join(os.getcwd(), self.migration_dir, migration.name)
+        """Load and validate Python migration module
+
+        The checksum recorded for it is recomputed from the file, like for SQL migrations,
+        never taken over from a manifest or cache.
+        """
+        migration_path = os.path.join(os.getcwd(), self._directory(migration), migration.name)
+        migration.analysis = Utils.analyze_file(migration.name, self._directory(migration), migration.algorithm)
+        migration.checksum = migration.analysis.checksum
 
         # Load the Python module dynamically
         spec = importlib.util.spec_from_file_location("migration_module", migration_path)
@@ -97,7 +203,7 @@ class Migrate():
         migration_module = importlib.util.module_from_spec(spec)
 
         # Add the migration directory to Python path temporarily
-        sys.path.insert(0, os.path.join(os.getcwd(), self.migration_dir))
+        sys.path.insert(0, os.path.join(os.getcwd(), self._directory(migration)))
         spec.loader.exec_module(migration_module)
 
         # Look for the migrate function
@@ -106,10 +212,13 @@ class Migrate():
 
         return migration_module
 
-    def _execute_python_migration(self, migration: Migration) -> None:
-        """Execute Python migration file (sync version)"""
+    def _execute_python_migration(self, migration: Migration, connection: Any = None) -> None:
+        """Execute Python migration file (sync version)
+
+        When connection is given the migration joins its open transaction and is not committed here.
+        """
         original_path = sys.path[:]
-        connection = None
+        owns_connection = connection is None
         try:
             migration_module = self._load_python_module(migration)
 
@@ -120,28 +229,35 @@ class Migrate():
                 raise RuntimeError(error_msg)
 
             # Execute the migration function
-            connection = self._db.connect()
+            if owns_connection:
+                connection = self._db.connect()
             migration_module.migrate(connection)
 
             # Auto-commit the transaction (consistent with SQL migrations)
-            connection.commit()
+            if owns_connection:
+                connection.commit()
 
         finally:
             # Close connection if it was opened and database requires it
-            if connection and self._db.should_close_connection():
+            if owns_connection and connection and self._db.should_close_connection():
                 connection.close()
             # Restore original Python path
             sys.path[:] = original_path
 
-    async def _execute_python_migration_async(self, migration: Migration) -> None:
+    async def _execute_python_migration_async(self, migration: Migration, connection: Any = None) -> None:
         """Execute Python migration file (async version)"""
         original_path = sys.path[:]
-        connection = None
+        owns_connection = connection is None
         try:
-            migration_module = self._load_python_module(migration)
+            migration_module = await self._offload(self._load_python_module, migration)
+
+            if owns_connection and self.args.async_driver and inspect.iscoroutinefunction(migration_module.migrate):
+                await self._execute_with_async_connection(migration_module)
+                return
 
             # Execute the migration function
-            connection = self._db.connect()
+            if owns_connection:
+                connection = await self._offload(self._db.connect)
 
             # Check if migrate is async
             if inspect.iscoroutinefunction(migration_module.migrate):
@@ -149,15 +265,26 @@ class Migrate():
                 await migration_module.migrate(connection)
             else:
                 # Run sync migration in thread pool to avoid blocking
-                loop = asyncio.get_event_loop()
-                await loop.run_in_executor(None, migration_module.migrate, connection)
+                await self._offload(migration_module.migrate, connection)
 
             # Auto-commit the transaction (consistent with SQL migrations)
-            connection.commit()
+            if owns_connection:
+                await self._offload(connection.commit)
 
         finally:
             # Close connection if it was opened and database requires it
-            if connection and self._db.should_close_connection():
-                connection.close()
+            if owns_connection and connection and self._db.should_close_connection():
+                await self._offload(connection.close)
             # Restore original Python path
             sys.path[:] = original_path
+
+    async def _execute_with_async_connection(self, migration_module: Any) -> None:
+        """Run an async migration on the adapter's native async connection or pool
+
+        The connection runs in autocommit mode, migrations that need a transaction open one themselves.
+        """
+        connection = await self._db.connect_async()
+        try:
+            await migration_module.migrate(connection)
+        finally:
+            await self._db.disconnect_async(connection)
@@ -1,27 +1,96 @@
-from pyway.helpers import Utils
-from typing import List, Any, Optional, Type
+from pyway.hashing import DEFAULT_ALGORITHM
+from pyway.helpers import FileAnalysis, LocalFile, MigrationNameParser, Utils
+from typing import List, Any, Optional, Tuple, Type
 
 
 class Migration():
     def __init__(self, version: Any, extension: Any, name: Any,
-                 checksum: Any, apply_timestamp: Optional[Any]) -> None:
-        self.version: str = version
+                 checksum: Any, apply_timestamp: Optional[Any], path: Optional[str] = None,
+                 algorithm: str = DEFAULT_ALGORITHM, local_file: Optional[LocalFile] = None) -> None:
+        self._version: str = version
+        self._version_key: Optional[Tuple[int, ...]] = None
         self.extension: str = extension
         self.name: str = name
-        self.checksum: str = checksum
+        self._checksum: Optional[str] = checksum
         self.apply_timestamp: Optional[Any] = apply_timestamp
+        # Directory of the local file, its checksum is read on first use when not given
+        self.path = path
+        self._analysis: Optional[FileAnalysis] = None
+        self._algorithm = algorithm
+        # Directory entry from the scan, its stat data is reused instead of statting the path again
+        self.local_file = local_file
+
+    @property
+    def version(self) -> str:
+        return self._version
+
+    @version.setter
+    def version(self, version: str) -> None:
+        self._version = version
+        self._version_key = None
+
+    @property
+    def version_key(self) -> Tuple[int, ...]:
+        """Numeric sort key of the version, parsed on first use and kept"""
+        if self._version_key is None:
+            self._version_key = Utils._version_sort_key(self._version)
+        return self._version_key
+
+    @property
+    def algorithm(self) -> str:
+        """Checksum algorithm of the local file"""
+        return self._algorithm
+
+    @algorithm.setter
+    def algorithm(self, algorithm: str) -> None:
+        if algorithm != self._algorithm and self.path is not None:
+            # The local file is checksummed again with the new algorithm
+            self._checksum = None
+            self._analysis = None
+        self._algorithm = algorithm
+
+    @property
+    def analysis(self) -> FileAnalysis:
+        """Checksum, size and line endings of the local file, from a single read kept for the run"""
+        if self._analysis is None:
+            self._analysis = Utils.analyze_file(self.name, self.path or '', self.algorithm)
+        return self._analysis
+
+    @analysis.setter
+    def analysis(self, analysis: FileAnalysis) -> None:
+        self._analysis = analysis
+
+    @property
+    def checksum(self) -> str:
+        if self._checksum is None and self.path is not None:
+            self._checksum = self.analysis.checksum
+        return self._checksum  # type: ignore[return-value]
+
+    @checksum.setter
+    def checksum(self, checksum: str) -> None:
+        self._checksum = checksum
+
+    @property
+    def has_checksum(self) -> bool:
+        """Whether the checksum is known without reading the file"""
+        return self._checksum is not None
 
     @classmethod
-    def from_name(cls: Type['Migration'], name: str, path: str, **kwargs: str) -> 'Migration':
-        version = Utils.format_version(kwargs.get('version', Utils.get_version_from_name(name)))
-        extension = kwargs.get('extension', Utils.get_extension_from_name(name))
-        checksum = kwargs.get('checksum', Utils.load_checksum_from_name(name, path))
+    def from_name(cls: Type['Migration'], name: str, path: str, algorithm: str = DEFAULT_ALGORITHM,
+                  local_file: Optional[LocalFile] = None, **kwargs: str) -> 'Migration':
+        parsed = MigrationNameParser.current().parse(name)
+        version = Utils.format_version(kwargs['version']) if 'version' in kwargs else parsed.version
+        extension = kwargs.get('extension', parsed.extension)
+        # Without a checksum the file is only read when the checksum is first used
+        checksum = kwargs.get('checksum')
         apply_timestamp = kwargs.get('apply_timestamp')
-        return cls(version, extension, name, checksum, apply_timestamp)
+        return cls(version, extension, name, checksum, apply_timestamp, path, algorithm, local_file)
 
     @classmethod
     def from_list(cls, list_: List['Migration']) -> List['Migration']:
-        return [cls(m.version, m.extension, m.name, m.checksum, m.apply_timestamp) for m in list_]
+        return [cls(m.version, m.extension, m.name, m._checksum, m.apply_timestamp, m.path, m.algorithm,
+                    m.local_file)
+                for m in list_]
 
     def __str__(self) -> str:
         return f"version={self.version}, extension={self.extension}, name={self.name}, " \
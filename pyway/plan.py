@@ -0,0 +1,58 @@
+from typing import Any, Dict, List, Optional
+
+from pyway.cache import ChecksumCache
+from pyway.catalog import load_checksums, load_migrations
+from pyway.hashing import get_algorithm
+from pyway.helpers import Utils
+from pyway.migration import Migration
+from pyway.configfile import ConfigFile
+from pyway.sources import MigrationSources
+
+
+class Plan():
+    """Local migration files and applied history, each loaded at most once.
+
+    Validate and Migrate share one plan during `pyway migrate`, so the migration
+    directory is scanned and checksummed and the history table fetched a single time.
+    """
+
+    def __init__(self, config: ConfigFile, db: Any) -> None:
+        self.db = db
+        self.migration_dir = config.database_migration_dir
+        self.sources = MigrationSources.from_config(config)
+        self.checksum_workers = int(config.checksum_workers) if config.checksum_workers else None
+        self.checksum_cache = Utils.to_bool(config.checksum_cache)
+        self.checksum_algorithm = get_algorithm(config.checksum_algorithm).name
+        self._local_migrations: Optional[List[Migration]] = None
+        self._db_migrations: Optional[List[Migration]] = None
+
+    @property
+    def local_migrations(self) -> List[Migration]:
+        if self._local_migrations is None:
+            self._local_migrations = load_migrations(self.sources, self.checksum_algorithm)
+        return self._local_migrations
+
+    @property
+    def db_migrations(self) -> List[Migration]:
+        if self._db_migrations is None:
+            self._db_migrations = self.db.get_all_schema_migrations()
+        return self._db_migrations
+
+    def load_checksums(self, migrations: List[Migration]) -> None:
+        """Checksum the local migrations about to be compared, in parallel and through the cache"""
+        if not self.checksum_cache:
+            load_checksums(migrations, self.checksum_workers)
+            return
+        # Each directory keeps its own cache next to its files
+        directories: Dict[str, List[Migration]] = {}
+        for migration in migrations:
+            directories.setdefault(migration.path or self.migration_dir, []).append(migration)
+        for directory, group in directories.items():
+            load_checksums(group, self.checksum_workers, ChecksumCache(directory))
+
+    def pending_migrations(self) -> List[Migration]:
+        return Utils.subtract(self.local_migrations, self.db_migrations)
+
+    def record(self, migration: Migration) -> None:
+        """Keep the loaded history in step with a migration that was just applied"""
+        self.db_migrations.append(migration)
@@ -1,5 +1,6 @@
 import sys
 import asyncio
+from typing import Any, Optional
 
 from pyway.settings import Settings
 from pyway.settings import ConfigFile
@@ -9,55 +10,76 @@ from pyway.migrate import Migrate
 from pyway.validate import Validate
 from pyway.import_ import Import
 from pyway.checksum import Checksum
+from pyway.index import Index
+from pyway.dbms.database import read_session, session
+from pyway.plan import Plan
 from pyway.helpers import Utils
 from pyway.version import __version__
 
 
-def migrate(config: ConfigFile) -> None:
-    # Validate first
-    validate(config, skip_errors=True)
+def migrate(config: ConfigFile, db: Any = None) -> None:
+    migrator = Migrate(config, db)
+
+    # Validate first, against the same plan so files and history are only loaded once
+    validate(config, skip_errors=True, plan=migrator.plan)
 
     logger.info('Starting migration process...')
-    output = Migrate(config).run()
+    output = migrator.run()
     logger.info(output)
     logger.info('Migration completed.')
 
 
-async def migrate_async(config: ConfigFile) -> None:
-    # Validate first (reuse sync validation)
-    validate(config, skip_errors=True)
+async def migrate_async(config: ConfigFile, db: Any = None) -> None:
+    migrator = Migrate(config, db)
+
+    # Validate first (reuse sync validation and its plan)
+    validate(config, skip_errors=True, plan=migrator.plan)
 
     logger.info('Starting async migration process...')
-    output = await Migrate(config).run_async()
+    output = await migrator.run_async()
     logger.info(output)
     logger.info('Migration completed.')
 
 
-def validate(config: ConfigFile, skip_errors: bool = False) -> None:
+def validate(config: ConfigFile, skip_errors: bool = False, db: Any = None, plan: Optional[Plan] = None) -> None:
     logger.info('Starting validation process')
-    output = Validate(config).run(skip_initial_check=True)
+    output = Validate(config, db, plan).run(skip_initial_check=True)
     logger.info(output)
     logger.info('Validation completed.')
 
 
-def info(config: ConfigFile) -> None:
+def info(config: ConfigFile, db: Any = None) -> None:
     logger.info('Gathering info...')
-    tbl = Info(config).run()
+    tbl = Info(config, db).run()
     logger.info(tbl)
 
 
-def import_(config: ConfigFile) -> None:
+def import_(config: ConfigFile, db: Any = None) -> None:
     logger.info("Importing schema...")
-    migration_name = Import(config).run()
+    migration_name = Import(config, db).run()
     logger.info(f"{migration_name} Imported")
 
 
-def checksum(config: ConfigFile) -> None:
+def checksum(config: ConfigFile, db: Any = None) -> None:
+    if config.checksum_all:
+        logger.info("Updating all checksums...")
+        updated = Checksum(config, db).run_all()
+        for name, checksum in updated:
+            logger.info(f"{name} checksum updated to {checksum}")
+        logger.info(f"{len(updated)} checksums updated")
+        return
+
     logger.info("Updating checksum...")
-    name, checksum = Checksum(config).run()
+    name, checksum = Checksum(config, db).run()
     logger.info(f"{name} checksum updated to {checksum}")
 
 
+def index(config: ConfigFile) -> None:
+    logger.info("Indexing migration files...")
+    path, count = Index(config).run()
+    logger.info(f"{count} migrations indexed in {path}")
+
+
 def cli() -> None:
     logger.info(f"PyWay {__version__}")
 
@@ -72,27 +94,44 @@ def cli() -> None:
     if config.database_collation is None:
         config.database_collation = 'utf8mb4_general_ci'
 
+    # Indexing only reads the migration directory, no database settings needed
+    if config.cmd == "index":
+        try:
+            index(config)
+        except RuntimeError as error:
+            logger.error(str(error))
+            sys.exit(1)
+        return
+
     # Validate required vars
     Utils.check_required_vars(["database_type", "database_table", "database_host",
                                "database_name", "database_username"], config)
 
+    if config.cmd not in ("info", "validate", "migrate", "import", "checksum"):
+        logger.error(f"Command '{config.cmd}' not recognized, exiting!")
+        sys.exit(1)
+
+    # info and validate never write, so adapters may open the database read-only
+    config.read_only = config.cmd in ("info", "validate")
+
     try:
-        if config.cmd == "info":
-            info(config)
-        elif config.cmd == "validate":
-            validate(config)
-        elif config.cmd == "migrate":
-            if hasattr(config, 'async_mode') and config.async_mode:
-                asyncio.run(migrate_async(config))
-            else:
-                migrate(config)
-        elif config.cmd == "import":
-            import_(config)
-        elif config.cmd == "checksum":
-            checksum(config)
-        else:
-            logger.error(f"Command '{config.cmd}' not recognized, exiting!")
-            sys.exit(1)
+        # One adapter (and connection) is shared by every step of the command,
+        # read-only commands go to the replica when one is configured
+        open_session = read_session if config.read_only else session
+        with open_session(config) as db:
+            if config.cmd == "info":
+                info(config, db)
+            elif config.cmd == "validate":
+                validate(config, db=db)
+            elif config.cmd == "migrate":
+                if hasattr(config, 'async_mode') and config.async_mode:
+                    asyncio.run(migrate_async(config, db))
+                else:
+                    migrate(config, db)
+            elif config.cmd == "import":
+                import_(config, db)
+            elif config.cmd == "checksum":
+                checksum(config, db)
     except RuntimeError as error:
         logger.error(str(error))
         sys.exit(1)
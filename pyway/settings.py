@@ -11,9 +11,14 @@ from pyway.configfile import MockArgs
 SQL_MIGRATION_PREFIX = os.environ.get('PYWAY_SQL_MIGRATION_PREFIX', 'V')
 SQL_MIGRATION_SEPARATOR = os.environ.get('PYWAY_SQL_MIGRATION_SEPARATOR', '__')
 SQL_MIGRATION_SUFFIXES = os.environ.get('PYWAY_SQL_MIGRATION_SUFFIXES', '.sql')
-ARGS = ['database_migration_dir', 'database_table', 'database_type', 'database_host',
+ARGS = ['database_migration_dir', 'database_migration_recursive', 'database_migration_include',
+        'database_migration_exclude', 'database_table', 'database_type', 'database_host',
         'database_port', 'database_name', 'database_username', 'database_password',
-        'database_collation', 'schema_file', 'checksum_file', 'config', 'version', 'async_mode', 'cmd']
+        'database_collation', 'database_replica_host', 'database_replica_port', 'database_replica_username',
+        'database_replica_password', 'database_replica_max_lag', 'database_pool_size', 'database_driver',
+        'database_bulk_mode', 'checksum_workers', 'checksum_cache', 'checksum_algorithm',
+        'schema_file', 'checksum_file', 'checksum_all', 'config', 'version', 'async_mode', 'async_driver',
+        'atomic_mode', 'cmd']
 
 
 class Settings():
@@ -28,24 +33,54 @@ class Settings():
     @classmethod
     def parse_arguments(self) -> ConfigFile:
         parser: argparse.ArgumentParser = argparse.ArgumentParser()
-        parser.add_argument("--database-migration-dir", help="Database migration directory")
+        parser.add_argument("--database-migration-dir", help="Database migration directories, separated by commas")
+        parser.add_argument("--database-migration-recursive", help="Search subdirectories of the migration directories",
+                            action='store_true')
+        parser.add_argument("--database-migration-include", help="Glob patterns of the migration files to use")
+        parser.add_argument("--database-migration-exclude", help="Glob patterns of the files and directories to skip")
         parser.add_argument("--database-table", help="Database table that stores pyway metadata")
-        parser.add_argument("--database-type", help="Database type [postgres|mysql|duckdb|sqlite]")
+        parser.add_argument("--database-type", help="Database type [postgres|psycopg|mysql|duckdb|sqlite]")
         parser.add_argument("--database-host", help="Database host")
         parser.add_argument("--database-port", help="Database port")
         parser.add_argument("--database-name", help="Database name")
         parser.add_argument("--database-username", help="Database username")
         parser.add_argument("--database-password", help="Database password")
         parser.add_argument("--database-collation", help="Database collation")
+        parser.add_argument("--database-replica-host", help="Read-only endpoint used by info and validate")
+        parser.add_argument("--database-replica-port", help="Read-only endpoint port")
+        parser.add_argument("--database-replica-username", help="Read-only endpoint username")
+        parser.add_argument("--database-replica-password", help="Read-only endpoint password")
+        parser.add_argument("--database-replica-max-lag",
+                            help="Use the primary when the read-only endpoint is more seconds behind than this")
+        parser.add_argument("--database-pool-size", help="Connection pool size (MySQL)")
+        parser.add_argument("--database-driver", help="Driver backend [cext|pure|mysqlclient] (MySQL)")
+        parser.add_argument("--database-bulk-mode", help="Use WAL and relaxed syncing while migrating (SQLite)",
+                            action='store_true')
+
+        parser.add_argument("--checksum-workers", help="Threads that checksum migration files (1 reads them serially)")
+
+        parser.add_argument("--checksum-cache", help="Reuse checksums of unchanged files from .pyway-cache",
+                            action='store_true')
+
+        parser.add_argument("--checksum-algorithm", help="Checksum algorithm of new migrations "
+                            "[crc32|blake2b|sha256|xxh3]")
 
         parser.add_argument("--schema-file", help="Schema file for import")
         parser.add_argument("--checksum-file", help="Checksum to update")
+        parser.add_argument("--checksum-all", help="Checksum every applied migration again with --checksum-algorithm",
+                            action='store_true')
         parser.add_argument("-c", "--config", help="Config file")
         parser.add_argument("-v", "--version", help="Version", action='store_true')
         parser.add_argument("--async", dest="async_mode",
                             help="Enable async mode for Python migrations",
                             action='store_true')
-        parser.add_argument("cmd", nargs="?", help="info|validate|migrate|import|checksum")
+        parser.add_argument("--async-driver", dest="async_driver",
+                            help="Give async Python migrations a native async connection or pool",
+                            action='store_true')
+        parser.add_argument("--atomic", dest="atomic_mode",
+                            help="Commit each migration together with its history row (postgres|duckdb|sqlite)",
+                            action='store_true')
+        parser.add_argument("cmd", nargs="?", help="info|validate|migrate|import|checksum|index")
 
         config: ConfigFile = self.parse_args(parser.parse_args())
 
@@ -0,0 +1,95 @@
+import fnmatch
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, List, Optional
+
+from pyway.configfile import ConfigFile
+from pyway.errors import DIRECTORY_NOT_FOUND
+from pyway.helpers import LocalFile, Utils
+
+
+def split_setting(value: Any) -> List[str]:
+    """Values of a setting given as a comma separated string or, in the config file, as a list"""
+    if not value:
+        return []
+    if isinstance(value, (list, tuple)):
+        return [str(item) for item in value]
+    return [item.strip() for item in str(value).split(",") if item.strip()]
+
+
+class MigrationSources():
+    """The directories migration files are found in.
+
+    database_migration_dir takes several directories separated by commas. With recursive,
+    their subdirectories are searched too. include and exclude are glob patterns matched
+    against paths relative to the directory, e.g. "2024/*" or "*/drafts". An excluded
+    subdirectory isn't entered. Hidden files and directories are always skipped.
+    """
+
+    def __init__(self, locations: List[str], recursive: bool = False,
+                 include: Optional[List[str]] = None, exclude: Optional[List[str]] = None) -> None:
+        self.locations = locations
+        self.recursive = recursive
+        self.include = include or []
+        self.exclude = exclude or []
+
+    @classmethod
+    def from_config(cls, config: ConfigFile, migration_dir: Optional[str] = None) -> 'MigrationSources':
+        locations = split_setting(migration_dir if migration_dir is not None else config.database_migration_dir)
+        return cls(locations, Utils.to_bool(config.database_migration_recursive),
+                   split_setting(config.database_migration_include), split_setting(config.database_migration_exclude))
+
+    @property
+    def flat(self) -> bool:
+        """A single directory without subdirectories or patterns, the layout of earlier releases"""
+        return len(self.locations) == 1 and not self.recursive and not self.include and not self.exclude
+
+    def _matches(self, relative: str, patterns: List[str]) -> bool:
+        return any(fnmatch.fnmatchcase(relative, pattern) for pattern in patterns)
+
+    def scan_location(self, location: str) -> List[LocalFile]:
+        if not self.recursive and not self.include and not self.exclude:
+            return Utils.scan_local_files(location)
+
+        local_files = []
+        # Directories still to list, relative to location
+        pending = [""]
+        while pending:
+            relative = pending.pop()
+            directory = os.path.join(location, relative) if relative else location
+            path = Utils.basepath(directory)
+            try:
+                with os.scandir(path) as entries:
+                    for entry in entries:
+                        if entry.name.startswith('.'):
+                            continue
+                        # Patterns always use forward slashes
+                        name = f"{relative}/{entry.name}" if relative else entry.name
+                        if self._matches(name, self.exclude):
+                            continue
+                        if entry.is_file():
+                            if not self.include or self._matches(name, self.include):
+                                local_files.append(LocalFile(entry, directory))
+                        elif self.recursive and entry.is_dir():
+                            pending.append(name)
+            except OSError:
+                raise FileNotFoundError(DIRECTORY_NOT_FOUND % path)
+        return local_files
+
+    def scan(self, workers: Optional[int] = None) -> List[List[LocalFile]]:
+        """Files of each location, the locations listed concurrently"""
+        if len(self.locations) < 2:
+            return [self.scan_location(location) for location in self.locations]
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pyway-scan") as executor:
+            return list(executor.map(self.scan_location, self.locations))
+
+    def find(self, name: str) -> Optional[str]:
+        """Directory of the migration file called name, None when there is none"""
+        if self.flat:
+            location = self.locations[0]
+            return location if os.path.isfile(os.path.join(Utils.basepath(location), name)) else None
+        for local_files in self.scan():
+            for local_file in local_files:
+                if local_file.name == name:
+                    return local_file.directory
+        return None
@@ -1,25 +1,29 @@
-import os
-from typing import List, Any, Union
+from typing import Any, Optional, Union
 
 from pyway.helpers import bcolors
 from pyway.helpers import Utils
+from pyway.hashing import algorithm_of
 from pyway.dbms.database import factory
 from pyway.migration import Migration
 from pyway.errors import (OUT_OF_DATE_ERROR, DIFF_NAME_ERROR, DIFF_CHECKSUM_ERROR,
                           MIGRATIONS_NOT_FOUND, MIGRATIONS_NOT_STARTED,
                           DIFF_CHECKSUM_ERROR_DOS)
 from pyway.configfile import ConfigFile
+from pyway.plan import Plan
 
 
 class Validate():
-    def __init__(self, args: ConfigFile) -> None:
-        self._db = factory(args.database_type)(args)
+    def __init__(self, args: ConfigFile, db: Any = None, plan: Optional[Plan] = None) -> None:
+        if plan is not None:
+            db = plan.db
+        self._db = db if db is not None else factory(args.database_type)(args)
+        self.plan = plan if plan is not None else Plan(args, self._db)
         self.migration_dir = args.database_migration_dir
         self.args = args
 
     def run(self,  skip_initial_check: bool = False) -> str:
-        local_migrations = self._get_all_local_migrations()
-        db_migrations = self._db.get_all_schema_migrations()
+        local_migrations = self.plan.local_migrations
+        db_migrations = self.plan.db_migrations
         output = ""
 
         if not db_migrations:
@@ -32,18 +36,25 @@ class Validate():
 
         if local_migrations:
             # Use tuple-based version keys for backward compatibility with old padded versions
-            local_migrations_map = {Utils._version_sort_key(m.version): m for m in local_migrations}
+            local_migrations_map = {m.version_key: m for m in local_migrations}
+            # Only files that were applied have their checksums compared, each with the algorithm of its row
+            applied = []
+            for db_migration in db_migrations:
+                applied_migration = local_migrations_map.get(db_migration.version_key)
+                if applied_migration is not None:
+                    applied_migration.algorithm = algorithm_of(db_migration.checksum)
+                    applied.append(applied_migration)
+            self.plan.load_checksums(applied)
             for db_migration in db_migrations:
                 output += Utils.color(f"Validating --> {db_migration.name}\n", bcolors.OKBLUE)
-                local_migration: Union[Migration, Any] = local_migrations_map.get(
-                    Utils._version_sort_key(db_migration.version)
-                )
+                local_migration: Union[Migration, Any] = local_migrations_map.get(db_migration.version_key)
                 if self._out_of_date(local_migration):
                     raise RuntimeError(OUT_OF_DATE_ERROR % db_migration.name)
                 elif not self._diff_names(local_migration, db_migration):
                     raise RuntimeError(DIFF_NAME_ERROR % (local_migration.name, db_migration.name))
                 elif not self._diff_checksum(local_migration, db_migration):
-                    if self._has_dos_line_endings(os.path.join(os.getcwd(), self.migration_dir, local_migration.name)):
+                    # Known from the pass that computed the checksum, unless it came from the cache
+                    if local_migration.analysis.crlf:
                         raise RuntimeError(DIFF_CHECKSUM_ERROR_DOS % (local_migration.name,
                                                                       local_migration.checksum,
                                                                       db_migration.checksum))
@@ -64,17 +75,3 @@ class Validate():
 
     def _diff_checksum(self, local_migration: Migration, db_migration: Migration) -> bool:
         return bool(local_migration.checksum == db_migration.checksum)
-
-    def _get_all_local_migrations(self) -> List:
-        local_files = Utils.get_local_files(self.migration_dir)
-        if not local_files:
-            return []
-        migrations = [Migration.from_name(local_file, self.migration_dir) for local_file in local_files]
-        return Utils.sort_migrations_list(migrations)
-
-    def _has_dos_line_endings(self, file_path: str) -> bool:
-        with open(file_path, 'rb') as file:
-            for line in file:
-                if b'\r\n' in line:
-                    return True
-        return False
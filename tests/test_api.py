@@ -0,0 +1,182 @@
+import pytest
+import os
+import sqlite3
+import duckdb
+
+from pyway import api
+from pyway.configfile import ConfigFile
+from pyway.dbms.connection import ConnectionSource
+
+
+@pytest.fixture
+def migration_dir(tmp_path):
+    path = tmp_path / 'migrations'
+    path.mkdir()
+    (path / 'V01_01__create.sql').write_text("CREATE TABLE embedded (id INTEGER);")
+    (path / 'V01_02__insert.sql').write_text("INSERT INTO embedded VALUES (1);")
+    return str(path)
+
+
+def embedded_config(database_type: str, migration_dir: str) -> ConfigFile:
+    # No name or credentials, the connection comes from the application
+    return ConfigFile(database_type=database_type, database_table='pyway', database_migration_dir=migration_dir)
+
+
+@pytest.mark.migrate_test
+@pytest.mark.sqlite_test
+def test_migrate_existing_connection(tmp_path, migration_dir) -> None:
+    connection = sqlite3.connect(str(tmp_path / 'app.sqlite'))
+    config = embedded_config('sqlite', migration_dir)
+
+    output = api.migrate(config, connection)
+    assert "V01_02__insert.sql SUCCESS" in output
+
+    # Still open and owned by the application
+    assert connection.execute("SELECT count(*) FROM embedded").fetchone()[0] == 1
+    assert "V01_02__insert.sql VALID" in api.validate(config, connection)
+    assert "V01_02__insert.sql" in api.info(config, connection)
+    assert "Nothing to do" in api.migrate(config, connection)
+    connection.close()
+
+
+@pytest.mark.migrate_test
+@pytest.mark.duckdb_test
+def test_migrate_existing_duckdb_connection(tmp_path, migration_dir) -> None:
+    # The application holds the file's write lock, pyway works through its connection
+    connection = duckdb.connect(str(tmp_path / 'app.duckdb'))
+    config = embedded_config('duckdb', migration_dir)
+
+    output = api.migrate(config, connection)
+    assert "V01_02__insert.sql SUCCESS" in output
+    assert connection.execute("SELECT count(*) FROM embedded").fetchone()[0] == 1
+    connection.close()
+
+
+@pytest.mark.migrate_test
+@pytest.mark.sqlite_test
+def test_migrate_connection_factory(tmp_path, migration_dir) -> None:
+    opened = []
+
+    def connect() -> sqlite3.Connection:
+        opened.append(sqlite3.connect(str(tmp_path / 'factory.sqlite')))
+        return opened[-1]
+
+    output = api.migrate(embedded_config('sqlite', migration_dir), connect)
+    assert "V01_02__insert.sql SUCCESS" in output
+
+    # One connection for the whole command, closed by pyway since it opened it
+    assert len(opened) == 1
+    with pytest.raises(sqlite3.ProgrammingError):
+        opened[0].execute("SELECT 1")
+
+
+@pytest.mark.migrate_test
+@pytest.mark.sqlite_test
+def test_migrate_sqlalchemy_engine(tmp_path, migration_dir) -> None:
+    sqlalchemy = pytest.importorskip("sqlalchemy")
+    engine = sqlalchemy.create_engine(f"sqlite:///{tmp_path / 'engine.sqlite'}")
+
+    output = api.migrate(embedded_config('sqlite', migration_dir), engine)
+    assert "V01_02__insert.sql SUCCESS" in output
+
+    # The connection went back to the engine's pool
+    assert engine.pool.checkedout() == 0
+    with engine.connect() as connection:
+        assert connection.execute(sqlalchemy.text("SELECT count(*) FROM embedded")).scalar() == 1
+    engine.dispose()
+
+
+@pytest.mark.migrate_test
+@pytest.mark.sqlite_test
+def test_python_migration_environment_restored(tmp_path, migration_dir, monkeypatch) -> None:
+    monkeypatch.delenv('PYWAY_DATABASE_NAME', raising=False)
+    monkeypatch.setenv('PYWAY_DATABASE_PASSWORD', 'outer')
+    with open(f"{migration_dir}/V01_03__check.py", 'w') as migration_file:
+        migration_file.write("import os\n\n\ndef migrate(connection):\n"
+                             "    assert os.environ['PYWAY_DATABASE_NAME'] == 'app.sqlite'\n")
+    config = embedded_config('sqlite', migration_dir)
+    config.database_name = 'app.sqlite'
+    config.database_password = 'secret'
+
+    connection = sqlite3.connect(str(tmp_path / 'app.sqlite'))
+    assert "V01_03__check.py SUCCESS" in api.migrate(config, connection)
+    connection.close()
+
+    # Exported for the migration only, later configs of the application see their own settings
+    assert 'PYWAY_DATABASE_NAME' not in os.environ
+    assert os.environ['PYWAY_DATABASE_PASSWORD'] == 'outer'
+    assert ConfigFile(database_name='other.sqlite').database_name == 'other.sqlite'
+
+
+@pytest.mark.migrate_test
+def test_borrowed_connection_autocommit_restored() -> None:
+    class Connection():
+        autocommit = False
+
+    class Pool():
+        def __init__(self) -> None:
+            self.connection = Connection()
+            self.returned = []
+
+        def getconn(self) -> Connection:
+            return self.connection
+
+        def putconn(self, connection: Connection) -> None:
+            self.returned.append(connection.autocommit)
+
+    pool = Pool()
+    borrowed = ConnectionSource(pool).acquire()
+    borrowed.autocommit = True
+    borrowed.autocommit = False
+    borrowed.autocommit = True
+    assert pool.connection.autocommit is True
+
+    # Handed back in the mode it was lent in
+    borrowed.close()
+    assert pool.returned == [False]
+
+
+@pytest.mark.migrate_test
+@pytest.mark.parametrize("pooled", [False, True])
+def test_sqlalchemy_autocommit_reaches_driver(tmp_path, pooled) -> None:
+    sqlalchemy = pytest.importorskip("sqlalchemy")
+
+    class DriverConnection(sqlite3.Connection):
+        # Like the psycopg drivers, which switch modes through this attribute
+        autocommit = False
+
+    opened = []
+
+    def connect() -> DriverConnection:
+        opened.append(sqlite3.connect(str(tmp_path / 'driver.sqlite'), factory=DriverConnection))
+        return opened[-1]
+
+    engine = sqlalchemy.create_engine("sqlite://", creator=connect)
+    borrowed = ConnectionSource(engine.pool if pooled else engine).acquire()
+    borrowed.autocommit = True
+    driver = opened[0]
+    assert driver.autocommit is True
+
+    borrowed.close()
+    assert driver.autocommit is False
+    engine.dispose()
+
+
+@pytest.mark.migrate_test
+def test_version_table_key_not_reused() -> None:
+    from pyway.dbms.database import version_table_key
+
+    config = embedded_config('sqlite', 'migrations')
+    # The same connection object, or a later one at the same address, in another session
+    connection = sqlite3.connect(':memory:')
+    assert version_table_key('sqlite', config, connection) != version_table_key('sqlite', config, connection)
+    assert version_table_key('sqlite', config) == version_table_key('sqlite', config)
+    connection.close()
+
+
+@pytest.mark.migrate_test
+def test_unsupported_connection_source() -> None:
+    with pytest.raises(TypeError) as e:
+        ConnectionSource(42).acquire()
+
+    assert "Unsupported connection source: int" in str(e.value)
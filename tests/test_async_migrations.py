@@ -182,3 +182,140 @@ def test_async_migration_without_async_flag() -> None:
             Migrate(config).run()
 
         assert "has async migrate() function - use --async flag" in str(excinfo.value)
+
+
+@pytest.mark.asyncio
+@pytest.mark.migrate_test
+@pytest.mark.sqlite_test
+@pytest.mark.python_test
+async def test_async_driver_migration(sqlite_connect_async) -> None:
+    """Test that --async-driver hands async migrations an awaitable connection"""
+    config = ConfigFile()
+    config.database_type = "sqlite"
+    config.database_name = './unittest-async-migrate.sqlite'
+    config.database_table = 'pyway'
+    config.async_mode = True
+    config.async_driver = True
+
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        async_migration_content = '''async def migrate(connection):
+    """Async migration on the thread-backed connection"""
+    import asyncio
+    await connection.execute("CREATE TABLE async_driver_test (id INTEGER PRIMARY KEY, data TEXT)")
+    await asyncio.gather(*(connection.execute("INSERT INTO async_driver_test (data) VALUES (?)", (f"row{i}",))
+                           for i in range(5)))
+    await connection.executemany("INSERT INTO async_driver_test (data) VALUES (?)", [("many1",), ("many2",)])
+    rows = await connection.fetchall("SELECT data FROM async_driver_test")
+    assert len(rows) == 7
+'''
+        migration_file = os.path.join(temp_dir, 'V01_01__async_driver.py')
+        with open(migration_file, 'w') as f:
+            f.write(async_migration_content)
+
+        config.database_migration_dir = temp_dir
+
+        output = await Migrate(config).run_async()
+        assert "V01_01__async_driver.py SUCCESS" in output
+
+        db = sqlite_connect_async
+        connection = db.connect()
+        cursor = connection.cursor()
+        cursor.execute("SELECT count(*) FROM async_driver_test")
+        assert cursor.fetchone()[0] == 7
+        cursor.execute("SELECT version FROM pyway")
+        assert cursor.fetchone()[0] == '01.01'
+
+        connection.close()
+
+
+@pytest.mark.asyncio
+@pytest.mark.migrate_test
+@pytest.mark.duckdb_test
+@pytest.mark.python_test
+async def test_async_driver_migration_duckdb(tmp_path) -> None:
+    """Test the thread-backed async connection on DuckDB"""
+    config = ConfigFile()
+    config.database_type = "duckdb"
+    config.database_name = str(tmp_path / 'async.duckdb')
+    config.database_table = 'pyway'
+    config.async_mode = True
+    config.async_driver = True
+
+    migration_dir = tmp_path / 'migrations'
+    migration_dir.mkdir()
+    (migration_dir / 'V01_01__async_driver.py').write_text('''async def migrate(connection):
+    await connection.execute("CREATE TABLE async_driver_test (id INTEGER, data TEXT)")
+    await connection.execute("INSERT INTO async_driver_test VALUES (?, ?)", (1, "one"))
+    row = await connection.fetchone("SELECT data FROM async_driver_test WHERE id = ?", (1,))
+    assert row[0] == "one"
+''')
+    config.database_migration_dir = str(migration_dir)
+
+    db = factory(config.database_type)(config)
+    try:
+        output = await Migrate(config, db).run_async()
+        assert "V01_01__async_driver.py SUCCESS" in output
+        assert db.connect().execute("SELECT count(*) FROM async_driver_test").fetchone()[0] == 1
+    finally:
+        db.disconnect()
+
+
+@pytest.mark.asyncio
+@pytest.mark.migrate_test
+@pytest.mark.sqlite_test
+async def test_run_async_does_not_block_event_loop(tmp_path, monkeypatch) -> None:
+    """Test that SQL scripts and history writes run on the given executor"""
+    import asyncio
+    import threading
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+
+    config = ConfigFile()
+    config.database_type = "sqlite"
+    config.database_name = str(tmp_path / 'heartbeat.sqlite')
+    config.database_table = 'pyway'
+    config.async_mode = True
+
+    migration_dir = tmp_path / 'migrations'
+    migration_dir.mkdir()
+    (migration_dir / 'V01_01__slow.sql').write_text("CREATE TABLE slow (id INTEGER);")
+    config.database_migration_dir = str(migration_dir)
+
+    db = factory(config.database_type)(config)
+    threads = []
+    execute, upgrade_version = db.execute, db.upgrade_version
+
+    def slow_execute(script, connection=None):
+        threads.append(threading.current_thread().name)
+        time.sleep(0.3)
+        return execute(script, connection)
+
+    def recorded_upgrade_version(migration, connection=None):
+        threads.append(threading.current_thread().name)
+        return upgrade_version(migration, connection)
+
+    monkeypatch.setattr(db, 'execute', slow_execute)
+    monkeypatch.setattr(db, 'upgrade_version', recorded_upgrade_version)
+
+    beats = 0
+
+    async def heartbeat():
+        nonlocal beats
+        while True:
+            await asyncio.sleep(0.01)
+            beats += 1
+
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="test-executor") as executor:
+        task = asyncio.ensure_future(heartbeat())
+        try:
+            output = await Migrate(config, db, executor=executor).run_async()
+        finally:
+            task.cancel()
+        db.disconnect()
+
+    assert "V01_01__slow.sql SUCCESS" in output
+    assert beats >= 10
+    assert all(name.startswith("test-executor") for name in threads)
+    assert len(threads) >= 2
@@ -0,0 +1,162 @@
+import pytest
+import json
+import os
+import stat
+
+from pyway import cache as cache_module
+from pyway.cache import ChecksumCache, CACHE_FILE
+from pyway.catalog import load_checksums, load_local_migrations
+from pyway.helpers import Utils
+
+
+def write_migration(path, name: str, content: str, age: int = 60) -> None:
+    (path / name).write_text(content)
+    # Old enough to be outside the racy window
+    mtime = os.stat(path / name).st_mtime - age
+    os.utime(path / name, (mtime, mtime))
+
+
+def checksummed(migration_dir, cache: ChecksumCache = None) -> list:
+    migrations = load_local_migrations(str(migration_dir))
+    load_checksums(migrations, cache=cache)
+    return migrations
+
+
+@pytest.fixture
+def migration_dir(tmp_path):
+    write_migration(tmp_path, 'V01_01__create.sql', "CREATE TABLE t (id int);")
+    write_migration(tmp_path, 'V01_02__insert.sql', "INSERT INTO t VALUES (1);")
+    return tmp_path
+
+
+def count_reads(monkeypatch) -> list:
+    reads = []
+    load = Utils.load_checksum_from_name
+
+    def counting_load(name, path, *args):
+        reads.append(name)
+        return load(name, path, *args)
+
+    monkeypatch.setattr(Utils, 'load_checksum_from_name', counting_load)
+    return reads
+
+
+@pytest.mark.helpers_test
+def test_warm_cache_skips_reads(migration_dir, monkeypatch) -> None:
+    expected = checksummed(migration_dir)
+    assert not (migration_dir / CACHE_FILE).exists()
+
+    reads = count_reads(monkeypatch)
+    cold = checksummed(migration_dir, ChecksumCache(str(migration_dir)))
+    assert sorted(reads) == ['V01_01__create.sql', 'V01_02__insert.sql']
+    assert (migration_dir / CACHE_FILE).exists()
+
+    reads.clear()
+    cache = ChecksumCache(str(migration_dir))
+    warm = checksummed(migration_dir, cache)
+    assert reads == []
+    assert cache.hits == 2
+    assert [m.checksum for m in cold] == [m.checksum for m in warm] == [m.checksum for m in expected]
+
+    # Nothing changed, so the cache file is not rewritten and no temporary files are left
+    assert sorted(os.listdir(migration_dir)) == [CACHE_FILE, 'V01_01__create.sql', 'V01_02__insert.sql']
+
+
+@pytest.mark.helpers_test
+def test_changed_file_is_checksummed_again(migration_dir, monkeypatch) -> None:
+    checksummed(migration_dir, ChecksumCache(str(migration_dir)))
+    write_migration(migration_dir, 'V01_02__insert.sql', "INSERT INTO t VALUES (2), (3);")
+
+    reads = count_reads(monkeypatch)
+    migrations = checksummed(migration_dir, ChecksumCache(str(migration_dir)))
+    assert reads == ['V01_02__insert.sql']
+    assert migrations[1].checksum == Utils.load_checksum_from_name('V01_02__insert.sql', str(migration_dir))
+
+
+@pytest.mark.helpers_test
+def test_recently_modified_file_is_not_cached(migration_dir) -> None:
+    write_migration(migration_dir, 'V01_03__fresh.sql', "SELECT 1;", age=0)
+    checksummed(migration_dir, ChecksumCache(str(migration_dir)))
+
+    entries = json.loads((migration_dir / CACHE_FILE).read_text())["entries"]
+    assert sorted(entries) == ['V01_01__create.sql', 'V01_02__insert.sql']
+
+
+@pytest.mark.helpers_test
+def test_cache_mode(migration_dir) -> None:
+    # Shared directories (CI caches, containers) are used by other users too
+    umask = os.umask(0o022)
+    try:
+        checksummed(migration_dir, ChecksumCache(str(migration_dir)))
+    finally:
+        os.umask(umask)
+    assert stat.S_IMODE(os.stat(migration_dir / CACHE_FILE).st_mode) == 0o644
+
+
+@pytest.mark.helpers_test
+def test_removed_file_is_dropped(migration_dir) -> None:
+    checksummed(migration_dir, ChecksumCache(str(migration_dir)))
+    os.remove(migration_dir / 'V01_02__insert.sql')
+    write_migration(migration_dir, 'V01_03__other.sql', "SELECT 1;")
+    checksummed(migration_dir, ChecksumCache(str(migration_dir)))
+
+    entries = json.loads((migration_dir / CACHE_FILE).read_text())["entries"]
+    assert sorted(entries) == ['V01_01__create.sql', 'V01_03__other.sql']
+
+
+@pytest.mark.helpers_test
+def test_partial_lookup_keeps_entries(migration_dir) -> None:
+    checksummed(migration_dir, ChecksumCache(str(migration_dir)))
+    write_migration(migration_dir, 'V01_03__other.sql', "SELECT 1;")
+
+    # Only some of the files are looked up, e.g. the outdated ones by checksum --checksum-all
+    cache = ChecksumCache(str(migration_dir))
+    cache.checksum('V01_03__other.sql')
+    cache.save()
+
+    entries = json.loads((migration_dir / CACHE_FILE).read_text())["entries"]
+    assert sorted(entries) == ['V01_01__create.sql', 'V01_02__insert.sql', 'V01_03__other.sql']
+
+
+@pytest.mark.helpers_test
+@pytest.mark.parametrize("content", ["{not json", '{"format": 0, "entries": {}}', '[]'])
+def test_unreadable_cache_is_ignored(migration_dir, content) -> None:
+    (migration_dir / CACHE_FILE).write_text(content)
+    cache = ChecksumCache(str(migration_dir))
+
+    migrations = checksummed(migration_dir, cache)
+    assert cache.misses == 2
+    assert migrations[0].checksum == Utils.load_checksum_from_name('V01_01__create.sql', str(migration_dir))
+    assert json.loads((migration_dir / CACHE_FILE).read_text())["format"] == cache_module.CACHE_FORMAT
+
+
+@pytest.mark.helpers_test
+def test_cache_keeps_algorithms_apart(migration_dir, monkeypatch) -> None:
+    checksummed(migration_dir, ChecksumCache(str(migration_dir)))
+
+    reads = count_reads(monkeypatch)
+    migrations = load_local_migrations(str(migration_dir), 'blake2b')
+    load_checksums(migrations, cache=ChecksumCache(str(migration_dir)))
+    # CRC32 entries don't answer for another algorithm
+    assert sorted(reads) == ['V01_01__create.sql', 'V01_02__insert.sql']
+    assert all(m.checksum.startswith('b2:') for m in migrations)
+
+    reads.clear()
+    migrations = load_local_migrations(str(migration_dir), 'blake2b')
+    load_checksums(migrations, cache=ChecksumCache(str(migration_dir)))
+    assert reads == []
+
+
+@pytest.mark.helpers_test
+def test_cache_uses_scan_stat(migration_dir, monkeypatch) -> None:
+    checksummed(migration_dir, ChecksumCache(str(migration_dir)))
+
+    stats = []
+    stat = os.stat
+    monkeypatch.setattr(cache_module.os, 'stat', lambda path, *args, **kwargs: stats.append(str(path)) or
+                        stat(path, *args, **kwargs))
+    cache = ChecksumCache(str(migration_dir))
+    checksummed(migration_dir, cache)
+    # The identity comes from the directory entries of the scan
+    assert cache.hits == 2
+    assert [path for path in stats if path.endswith('.sql')] == []
@@ -0,0 +1,124 @@
+import pytest
+import threading
+
+from pyway.catalog import load_checksums, load_local_migrations
+from pyway.helpers import Utils
+from pyway.info import Info
+from pyway.migration import Migration
+from pyway.settings import ConfigFile
+
+
+@pytest.fixture
+def migration_dir(tmp_path):
+    # Written out of order so the result has to be sorted
+    for version in (10, 2, 7, 1, 5, 3, 9, 4, 8, 6):
+        (tmp_path / f'V01_{version:02d}__step.sql').write_text(f"SELECT {version};\n" * version)
+    return str(tmp_path)
+
+
+def count_reads(monkeypatch) -> list:
+    reads = []
+    analyze = Utils.analyze_file
+
+    def recording_analyze(name, path, *args):
+        reads.append((name, threading.current_thread().name))
+        return analyze(name, path, *args)
+
+    monkeypatch.setattr(Utils, 'analyze_file', recording_analyze)
+    return reads
+
+
+@pytest.mark.helpers_test
+def test_load_local_migrations_reads_no_files(migration_dir, monkeypatch) -> None:
+    reads = count_reads(monkeypatch)
+    migrations = load_local_migrations(migration_dir)
+
+    assert [m.version for m in migrations] == [f"01.{version:02d}" for version in range(1, 11)]
+    assert reads == []
+
+    # Read on first use only
+    checksum = migrations[0].checksum
+    assert checksum == migrations[0].checksum
+    assert [name for name, _ in reads] == ['V01_01__step.sql']
+
+
+@pytest.mark.helpers_test
+@pytest.mark.parametrize("workers", [None, 1, 4])
+def test_load_checksums(migration_dir, workers) -> None:
+    migrations = load_local_migrations(migration_dir)
+    load_checksums(migrations, workers)
+
+    assert all(m.has_checksum for m in migrations)
+    assert [m.checksum for m in migrations] == \
+        [Utils.load_checksum_from_name(m.name, migration_dir) for m in migrations]
+
+
+@pytest.mark.helpers_test
+def test_load_checksums_threads(migration_dir, monkeypatch) -> None:
+    reads = count_reads(monkeypatch)
+
+    load_checksums(load_local_migrations(migration_dir), 1)
+    assert {thread for _, thread in reads} == {threading.current_thread().name}
+
+    reads.clear()
+    load_checksums(load_local_migrations(migration_dir), 4)
+    assert len(reads) == 10
+    assert all(thread.startswith("pyway-checksum") for _, thread in reads)
+
+
+@pytest.mark.helpers_test
+def test_load_checksums_skips_known(migration_dir, monkeypatch) -> None:
+    migrations = load_local_migrations(migration_dir)
+    migrations[0].checksum = "ABC"
+    reads = count_reads(monkeypatch)
+
+    load_checksums(migrations, 4)
+    assert len(reads) == 9
+    assert migrations[0].checksum == "ABC"
+
+
+@pytest.mark.helpers_test
+def test_load_local_migrations_invalid_name(migration_dir, tmp_path) -> None:
+    (tmp_path / 'not_a_migration.sql').write_text("SELECT 1;")
+
+    with pytest.raises(ValueError):
+        load_local_migrations(migration_dir)
+
+
+@pytest.mark.info_test
+def test_info_reads_no_new_files(migration_dir, monkeypatch) -> None:
+    config = ConfigFile()
+    config.database_migration_dir = migration_dir
+
+    class EmptyHistory():
+        def get_all_schema_migrations(self) -> list:
+            return []
+
+    reads = count_reads(monkeypatch)
+    migrations = Info(config, EmptyHistory()).get_table_info()
+    assert len(migrations) == 10
+    assert reads == []
+    assert isinstance(migrations[0], Migration)
+
+
+@pytest.mark.migrate_test
+@pytest.mark.sqlite_test
+def test_migrate_reads_only_pending_files(migration_dir, tmp_path, monkeypatch) -> None:
+    from pyway.dbms.database import session
+    from pyway.migrate import Migrate
+
+    config = ConfigFile()
+    config.database_type = "sqlite"
+    config.database_name = str(tmp_path) + '.sqlite'
+    config.database_table = 'pyway'
+    config.database_migration_dir = migration_dir
+
+    with session(config) as db:
+        Migrate(config, db).run()
+
+    (tmp_path / 'V01_11__step.sql').write_text("SELECT 11;")
+    reads = count_reads(monkeypatch)
+    with session(config) as db:
+        Migrate(config, db).run()
+    # The script read for execution also provides the stored checksum
+    assert reads == []
@@ -4,7 +4,7 @@ from __future__ import annotations
 import pytest
 
 from pyway.configfile import ConfigFile
-from pyway.dbms.database import factory
+from pyway.dbms.database import factory, ENSURED_VERSION_TABLES
 from pyway.dbms import duckdb
 from pyway.migration import Migration
 
@@ -16,6 +16,7 @@ def test_factory() -> None:
     args.database_name = "./unittest.duckdb"
     args.database_table = "pyway"
     db: duckdb.Duckdb = factory(args.database_type)(args)
+    db.create_version_table_if_not_exists()
 
     assert db.connect().sql(
         f"select 1 from information_schema.tables where table_name = '{args.database_table}'"
@@ -24,6 +25,30 @@ def test_factory() -> None:
     db.disconnect()
 
 
+@pytest.mark.duckdb_test
+def test_factory_no_ddl() -> None:
+    args = ConfigFile()
+    args.database_type = "duckdb"
+    args.database_name = "./unittest.duckdb"
+    args.database_table = "pyway_lazy"
+    db: duckdb.Duckdb = factory(args.database_type)(args)
+    db.execute(f"drop table if exists {args.database_table}")
+    ENSURED_VERSION_TABLES.clear()
+
+    # Neither construction nor reads create the history table
+    db = factory(args.database_type)(args)
+    assert db.get_all_schema_migrations() == []
+    assert db.connect().sql(
+        f"select 1 from information_schema.tables where table_name = '{args.database_table}'"
+    ).fetchone() is None
+
+    # The first history write creates it
+    db.upgrade_version(Migration("01.01", "SQL", "V01_01__test1.sql", "8327AD7B", None))
+    assert len(db.get_all_schema_migrations()) == 1
+
+    db.disconnect()
+
+
 @pytest.mark.duckdb_test
 def test_migrations() -> None:
     args = ConfigFile()
@@ -32,6 +57,7 @@ def test_migrations() -> None:
     args.database_table = "pyway"
     db: duckdb.Duckdb = factory(args.database_type)(args)
 
+    db.create_version_table_if_not_exists()
     db.execute(f"truncate table {args.database_table}")
 
     migrations = db.get_all_schema_migrations()
@@ -69,3 +95,140 @@ def test_migrations() -> None:
     assert fetched.extension == updated.extension
 
     db.disconnect()
+
+
+@pytest.mark.duckdb_test
+def test_read_only() -> None:
+    args = ConfigFile()
+    args.database_type = "duckdb"
+    args.database_name = "./unittest.duckdb"
+    args.database_table = "pyway"
+    db: duckdb.Duckdb = factory(args.database_type)(args)
+    db.execute("drop table if exists pyway_readonly")
+    db.disconnect()
+
+    args.database_table = "pyway_readonly"
+    args.read_only = True
+    db = factory(args.database_type)(args)
+
+    # A missing history table reads as an empty history and is not created
+    assert db.get_all_schema_migrations() == []
+    assert db.connect().sql(
+        f"select 1 from information_schema.tables where table_name = '{args.database_table}'"
+    ).fetchone() is None
+
+    db.disconnect()
+
+
+@pytest.mark.duckdb_test
+def test_read_only_missing_file(tmp_path) -> None:
+    args = ConfigFile()
+    args.database_type = "duckdb"
+    args.database_name = str(tmp_path / "missing.duckdb")
+    args.database_table = "pyway"
+    args.read_only = True
+    db: duckdb.Duckdb = factory(args.database_type)(args)
+
+    # Nothing migrated yet, and the file is not created
+    assert db.get_all_schema_migrations() == []
+    db.disconnect()
+    assert not (tmp_path / "missing.duckdb").exists()
+
+
+@pytest.mark.duckdb_test
+def test_transaction_rollback() -> None:
+    args = ConfigFile()
+    args.database_type = "duckdb"
+    args.database_name = "./unittest.duckdb"
+    args.database_table = "pyway"
+    db: duckdb.Duckdb = factory(args.database_type)(args)
+    db.create_version_table_if_not_exists()
+    db.execute(f"truncate table {args.database_table}")
+    db.execute("drop table if exists atomic_test")
+
+    mig = Migration(
+        version="01.01", extension="SQL",
+        name="V01_01__test1.sql",
+        checksum="8327AD7B",
+        apply_timestamp=None
+    )
+
+    with pytest.raises(duckdb.duckdb.CatalogException):
+        with db.transaction() as connection:
+            db.execute("create table atomic_test (id int)", connection)
+            db.upgrade_version(mig, connection)
+            db.execute("insert into missing_table values (1)", connection)
+
+    # Both the DDL and the history row were rolled back
+    assert db.get_all_schema_migrations() == []
+    assert db.connect().sql(
+        "select 1 from information_schema.tables where table_name = 'atomic_test'"
+    ).fetchone() is None
+
+    with db.transaction() as connection:
+        db.execute("create table atomic_test (id int)", connection)
+        db.upgrade_version(mig, connection)
+
+    assert len(db.get_all_schema_migrations()) == 1
+
+    db.disconnect()
+
+
+@pytest.mark.duckdb_test
+def test_history_values_are_bound() -> None:
+    args = ConfigFile()
+    args.database_type = "duckdb"
+    args.database_name = "./unittest.duckdb"
+    args.database_table = "pyway"
+    db: duckdb.Duckdb = factory(args.database_type)(args)
+    db.create_version_table_if_not_exists()
+    db.execute(f"truncate table {args.database_table}")
+
+    # Quotes in values must be stored verbatim rather than break the statement
+    mig = Migration(
+        version="01.01", extension="SQL",
+        name="V01_01__it's.sql",
+        checksum="8327AD7B",
+        apply_timestamp=None
+    )
+    db.upgrade_version(mig)
+    mig.checksum = "'; drop table pyway; --"
+    db.update_checksum(mig)
+
+    fetched = db.get_schema_migration(mig.version)
+    assert fetched.name == mig.name
+    assert fetched.checksum == mig.checksum
+
+    db.disconnect()
+
+
+@pytest.mark.duckdb_test
+def test_version_index() -> None:
+    args = ConfigFile()
+    args.database_type = "duckdb"
+    args.database_name = "./unittest.duckdb"
+    args.database_table = "pyway_indexed"
+    db: duckdb.Duckdb = factory(args.database_type)(args)
+
+    # A history table created before the index existed
+    db.execute(f"drop table if exists {args.database_table}")
+    db.execute(duckdb.CREATE_VERSION_MIGRATIONS % args.database_table)
+    ENSURED_VERSION_TABLES.clear()
+
+    db.create_version_table_if_not_exists()
+    assert db.connect().sql(
+        "select 1 from duckdb_indexes() where index_name = 'pyway_indexed_version_idx'"
+    ).fetchone() is not None
+
+    mig = Migration(
+        version="01.01", extension="SQL",
+        name="V01_01__test1.sql",
+        checksum="8327AD7B",
+        apply_timestamp=None
+    )
+    db.upgrade_version(mig)
+    with pytest.raises(duckdb.duckdb.ConstraintException):
+        db.upgrade_version(mig)
+    assert len(db.get_all_schema_migrations()) == 1
+
+    db.disconnect()
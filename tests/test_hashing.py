@@ -0,0 +1,74 @@
+import pytest
+import base64
+import hashlib
+import zlib
+
+from pyway import helpers
+from pyway.hashing import ALGORITHMS, algorithm_of, get_algorithm
+from pyway.helpers import FileAnalysis, Utils
+from pyway.migration import Migration
+
+CONTENT = b"INSERT INTO t VALUES (1);\r\n" * 100
+
+
+@pytest.fixture
+def migration_dir(tmp_path):
+    (tmp_path / 'V01_01__seed.sql').write_bytes(CONTENT)
+    return str(tmp_path)
+
+
+@pytest.mark.helpers_test
+@pytest.mark.parametrize("algorithm", ["crc32", "blake2b", "sha256"])
+def test_analyze_file_algorithms(migration_dir, monkeypatch, algorithm) -> None:
+    # Several chunks per file
+    monkeypatch.setattr(helpers, 'CHECKSUM_CHUNK_SIZE', 1000)
+    analysis = Utils.analyze_file('V01_01__seed.sql', migration_dir, algorithm)
+
+    assert analysis.algorithm == algorithm
+    assert analysis.checksum == FileAnalysis.of_bytes(CONTENT, algorithm).checksum
+    assert algorithm_of(analysis.checksum) == algorithm
+    # Fits the history table's checksum column
+    assert len(analysis.checksum) <= 25
+
+
+@pytest.mark.helpers_test
+def test_checksum_values() -> None:
+    assert FileAnalysis.of_bytes(CONTENT).checksum == "%X" % zlib.crc32(CONTENT)
+    assert FileAnalysis.of_bytes(CONTENT, "sha256").checksum.startswith("s2:")
+    digest = hashlib.blake2b(CONTENT, digest_size=16).digest()
+    assert FileAnalysis.of_bytes(CONTENT, "blake2b").checksum == \
+        "b2:" + base64.urlsafe_b64encode(digest).decode().rstrip("=")
+
+
+@pytest.mark.helpers_test
+def test_xxh3() -> None:
+    pytest.importorskip("xxhash")
+    checksum = FileAnalysis.of_bytes(CONTENT, "xxh3").checksum
+    assert len(checksum) == 25
+    assert algorithm_of(checksum) == "xxh3"
+
+
+@pytest.mark.helpers_test
+def test_algorithm_names() -> None:
+    assert get_algorithm(None).name == "crc32"
+    assert get_algorithm("BLAKE2B").name == "blake2b"
+    with pytest.raises(RuntimeError):
+        get_algorithm("md5")
+
+    # Rows of earlier releases carry bare hex
+    assert algorithm_of("9B8E1E62") == "crc32"
+    with pytest.raises(RuntimeError):
+        algorithm_of("zz:abc")
+    assert len({algorithm.tag for algorithm in ALGORITHMS.values()}) == len(ALGORITHMS)
+
+
+@pytest.mark.helpers_test
+def test_migration_algorithm_change(migration_dir) -> None:
+    migration = Migration.from_name('V01_01__seed.sql', migration_dir)
+    crc = migration.checksum
+
+    migration.algorithm = "sha256"
+    assert migration.checksum.startswith("s2:")
+
+    migration.algorithm = "crc32"
+    assert migration.checksum == crc
@@ -1,5 +1,7 @@
 import pytest
 import os
+import zlib
+from pyway import helpers
 from pyway.helpers import Utils
 from pyway.migration import Migration
 
@@ -10,6 +12,18 @@ def test_get_local_files() -> None:
     assert len(files) == 4  # Updated to include Python migration file
 
 
+@pytest.mark.helpers_test
+def test_scan_local_files(tmp_path) -> None:
+    (tmp_path / 'V01_01__test1.sql').write_text("SELECT 1;")
+    (tmp_path / '.pyway-cache').write_text("{}")
+    (tmp_path / 'V01_02__directory.sql').mkdir()
+
+    files = Utils.scan_local_files(str(tmp_path))
+    assert [f.name for f in files] == ['V01_01__test1.sql']
+    stat = os.stat(tmp_path / 'V01_01__test1.sql')
+    assert (files[0].size, files[0].mtime_ns, files[0].inode) == (stat.st_size, stat.st_mtime_ns, stat.st_ino)
+
+
 @pytest.mark.helpers_test
 def test_get_local_files_notfound() -> None:
     with pytest.raises(Exception):
@@ -66,6 +80,60 @@ def test_load_checksum_from_name_failed() -> None:
     assert True
 
 
+def line_by_line_checksum(fullname: str) -> str:
+    """Checksum as computed by earlier releases"""
+    prev = 0
+    with open(fullname, "rb") as file:
+        for line in file:
+            prev = zlib.crc32(line, prev)
+    return "%X" % (prev & 0xFFFFFFFF)
+
+
+@pytest.mark.helpers_test
+@pytest.mark.parametrize("content", [
+    b"",
+    b"CREATE TABLE t (id int);\n",
+    b"INSERT INTO t VALUES (1);\r\nINSERT INTO t VALUES (2);\r\n",
+    b"".join(b"INSERT INTO t VALUES (%d);\n" % i for i in range(5000)),
+    b"INSERT INTO t VALUES " + b",".join(b"(%d)" % i for i in range(20000)) + b";",
+])
+def test_load_checksum_matches_line_by_line(tmp_path, monkeypatch, content) -> None:
+    # Small chunks so lines and the single long INSERT straddle chunk boundaries
+    monkeypatch.setattr(helpers, 'CHECKSUM_CHUNK_SIZE', 1000)
+    (tmp_path / 'V01_01__seed.sql').write_bytes(content)
+
+    checksum = Utils.load_checksum_from_name('V01_01__seed.sql', str(tmp_path))
+    assert checksum == line_by_line_checksum(str(tmp_path / 'V01_01__seed.sql'))
+
+
+@pytest.mark.helpers_test
+@pytest.mark.parametrize("content, crlf", [
+    (b"", False),
+    (b"SELECT 1;\nSELECT 2;\n", False),
+    (b"SELECT 1;\r\nSELECT 2;\r\n", True),
+    (b"SELECT '\r';\n", False),
+    # The pair straddles the 1000 byte chunk boundary
+    (b"x" * 999 + b"\r\n", True),
+])
+def test_analyze_file(tmp_path, monkeypatch, content, crlf) -> None:
+    monkeypatch.setattr(helpers, 'CHECKSUM_CHUNK_SIZE', 1000)
+    (tmp_path / 'V01_01__seed.sql').write_bytes(content)
+
+    analysis = Utils.analyze_file('V01_01__seed.sql', str(tmp_path))
+    assert analysis.crlf == crlf
+    assert analysis.size == len(content)
+    assert analysis.checksum == line_by_line_checksum(str(tmp_path / 'V01_01__seed.sql'))
+
+    in_memory = helpers.FileAnalysis.of_bytes(content)
+    assert (in_memory.checksum, in_memory.size, in_memory.crlf) == (analysis.checksum, analysis.size, analysis.crlf)
+
+
+@pytest.mark.helpers_test
+def test_load_checksum_known_value() -> None:
+    assert Utils.load_checksum_from_name('V01_01__test1.sql', os.path.join('tests', 'data', 'schema')) == \
+        line_by_line_checksum(os.path.join('tests', 'data', 'schema', 'V01_01__test1.sql'))
+
+
 @pytest.mark.helpers_test
 def test_version_name() -> None:
     assert Utils.is_file_name_valid('V1_1__test1.sql')
@@ -233,3 +301,39 @@ def test_format_version() -> None:
     assert Utils.format_version('1_2_3') == '1.2.3'
     assert Utils.format_version('01_02_03') == '01.02.03'  # Padding preserved
     assert Utils.format_version('100.200.300') == '100.200.300'
+
+
+@pytest.mark.helpers_test
+def test_migration_name_parser() -> None:
+    parser = helpers.MigrationNameParser.current()
+    # Compiled once for the naming settings in effect
+    assert helpers.MigrationNameParser.current() is parser
+
+    parsed = parser.parse('V01_02_3__add_users.sql')
+    assert (parsed.version, parsed.version_key, parsed.description, parsed.extension) == \
+        ('01.02.3', (1, 2, 3), 'add_users', 'SQL')
+    assert parser.is_valid('V01_02_3__add_users.sql')
+    with pytest.raises(ValueError):
+        parser.parse('add_users.sql')
+
+
+@pytest.mark.helpers_test
+def test_migration_name_parser_settings(monkeypatch) -> None:
+    monkeypatch.setattr(helpers.settings, 'SQL_MIGRATION_PREFIX', 'R')
+    assert Utils.is_file_name_valid('R1__test1.sql')
+    assert not Utils.is_file_name_valid('V1__test1.sql')
+    assert Utils.get_version_from_name('R1_2__test1.sql') == '1.2'
+
+
+@pytest.mark.helpers_test
+def test_version_key_cached(monkeypatch) -> None:
+    migration = Migration.from_name('V01_10__test1.sql', os.path.join('tests', 'data', 'schema'))
+    assert migration.version_key == (1, 10)
+
+    monkeypatch.setattr(Utils, '_version_sort_key', lambda version: pytest.fail("version parsed again"))
+    assert Utils.sort_migrations_list([migration]) == [migration]
+    assert Utils.subtract([migration], [migration]) == []
+
+    monkeypatch.undo()
+    migration.version = '1.11'
+    assert migration.version_key == (1, 11)
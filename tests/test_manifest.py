@@ -0,0 +1,149 @@
+import pytest
+import json
+import os
+import stat
+
+from pyway.catalog import load_local_migrations, local_file_names
+from pyway.helpers import Utils
+from pyway.index import Index
+from pyway.manifest import load_manifest
+from pyway.settings import ConfigFile
+from pyway.sources import MigrationSources
+
+
+@pytest.fixture
+def migration_dir(tmp_path):
+    for version in (2, 1, 3):
+        (tmp_path / f'V01_0{version}__step.sql').write_text(f"CREATE TABLE step{version} (id INTEGER);")
+    return tmp_path
+
+
+def index(migration_dir, **kwargs) -> str:
+    path, count = Index(ConfigFile(database_migration_dir=str(migration_dir), **kwargs)).run()
+    assert count == len(Utils.get_local_files(str(migration_dir)))
+    return path
+
+
+def no_read(monkeypatch) -> None:
+    monkeypatch.setattr(Utils, 'analyze_file', lambda *args: pytest.fail("file read"))
+
+
+@pytest.mark.helpers_test
+def test_index(migration_dir, monkeypatch) -> None:
+    path = index(migration_dir)
+    with open(path, encoding="utf-8") as manifest_file:
+        entries = json.load(manifest_file)["entries"]
+    assert [entry[:3] for entry in entries] == [['V01_01__step.sql', '01.01', 'SQL'],
+                                                ['V01_02__step.sql', '01.02', 'SQL'],
+                                                ['V01_03__step.sql', '01.03', 'SQL']]
+    expected = [Utils.load_checksum_from_name(entry[0], str(migration_dir)) for entry in entries]
+
+    no_read(monkeypatch)
+    migrations = load_local_migrations(str(migration_dir))
+    assert [m.checksum for m in migrations] == expected
+    assert local_file_names(MigrationSources([str(migration_dir)])) == [m.name for m in migrations]
+
+
+@pytest.mark.helpers_test
+def test_index_mode(migration_dir) -> None:
+    # Readable by other users, like any file created with the process umask
+    umask = os.umask(0o022)
+    try:
+        path = index(migration_dir)
+    finally:
+        os.umask(umask)
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o644
+
+
+@pytest.mark.helpers_test
+def test_index_new_file(migration_dir) -> None:
+    index(migration_dir)
+    (migration_dir / 'V01_04__step.sql').write_text("CREATE TABLE step4 (id INTEGER);")
+
+    migrations = load_local_migrations(str(migration_dir))
+    assert [m.name for m in migrations][-1] == 'V01_04__step.sql'
+    assert [m.has_checksum for m in migrations] == [True, True, True, False]
+
+
+@pytest.mark.helpers_test
+def test_index_edited_file(migration_dir) -> None:
+    index(migration_dir)
+    indexed = load_manifest(str(migration_dir))['V01_02__step.sql'][5]
+    # Edited in place, the directory itself doesn't change
+    path = migration_dir / 'V01_02__step.sql'
+    path.write_text("CREATE TABLE step2 (id BIGINT, name TEXT);")
+    os.utime(path, ns=(os.stat(path).st_atime_ns, os.stat(path).st_mtime_ns + 10 ** 9))
+
+    migration = load_local_migrations(str(migration_dir))[1]
+    assert not migration.has_checksum
+    assert migration.checksum != indexed
+    assert migration.checksum == Utils.load_checksum_from_name('V01_02__step.sql', str(migration_dir))
+
+
+@pytest.mark.helpers_test
+def test_index_other_algorithm(migration_dir) -> None:
+    index(migration_dir)
+
+    migrations = load_local_migrations(str(migration_dir), 'blake2b')
+    assert not any(m.has_checksum for m in migrations)
+    assert migrations[0].checksum.startswith('b2:')
+
+
+@pytest.mark.migrate_test
+@pytest.mark.sqlite_test
+def test_migrate_with_index(migration_dir, tmp_path_factory, monkeypatch) -> None:
+    from pyway.dbms.database import session
+    from pyway.migrate import Migrate
+    from pyway.validate import Validate
+
+    config = ConfigFile()
+    config.database_type = "sqlite"
+    config.database_name = str(tmp_path_factory.mktemp('db') / 'index.sqlite')
+    config.database_table = 'pyway'
+    config.database_migration_dir = str(migration_dir)
+    index(migration_dir)
+
+    with session(config) as db:
+        assert "V01_03__step.sql SUCCESS" in Migrate(config, db).run()
+
+    # Validation doesn't read the indexed files
+    no_read(monkeypatch)
+    with session(config) as db:
+        assert "V01_03__step.sql VALID" in Validate(config, db).run()
+
+    monkeypatch.undo()
+    with open(migration_dir / 'V01_01__step.sql', 'a') as migration_file:
+        migration_file.write("-- edited\n")
+    with session(config) as db:
+        with pytest.raises(RuntimeError):
+            Validate(config, db).run()
+
+
+@pytest.mark.migrate_test
+@pytest.mark.sqlite_test
+def test_migrate_python_with_index(tmp_path, tmp_path_factory) -> None:
+    import sqlite3
+    from pyway.dbms.database import session
+    from pyway.migrate import Migrate
+
+    migration_dir = tmp_path
+    path = migration_dir / 'V01_01__step.py'
+    path.write_text("def migrate(connection):\n    connection.execute('CREATE TABLE step1 (id INTEGER)')\n")
+    config = ConfigFile()
+    config.database_type = "sqlite"
+    config.database_name = str(tmp_path_factory.mktemp('db') / 'index.sqlite')
+    config.database_table = 'pyway'
+    config.database_migration_dir = str(migration_dir)
+    index(migration_dir)
+
+    # Same size and mtime, the manifest entry is still taken as current
+    stat = os.stat(path)
+    path.write_text("def migrate(connection):\n    connection.execute('CREATE TABLE step2 (id INTEGER)')\n")
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+    with session(config) as db:
+        assert "V01_01__step.py SUCCESS" in Migrate(config, db).run()
+    with sqlite3.connect(config.database_name) as connection:
+        assert connection.execute("SELECT checksum FROM pyway").fetchone()[0] == \
+            Utils.load_checksum_from_name('V01_01__step.py', str(migration_dir))
+        assert connection.execute("SELECT name FROM sqlite_master WHERE name = 'step2'").fetchone()
@@ -1,8 +1,11 @@
 import pytest
 import os
+import mysql.connector
+from mysql.connector.connection import MySQLConnection
 from strip_ansi import strip_ansi
 from pyway.migrate import Migrate
 from pyway.settings import ConfigFile
+from pyway.dbms.database import session
 
 from mysqld_integration_test import Mysqld
 
@@ -85,3 +88,108 @@ def test_pyway_migrate_no_local_files(mysqld_connect: Mysqld) -> None:
         _ = Migrate(config).run()
 
     assert bool("no local migration files found" in str(e.value))
+
+
+@pytest.mark.migrate_test
+@pytest.mark.mysqld_test
+def test_pyway_migrate_pooled(mysqld_connect: Mysqld) -> None:
+    config = ConfigFile()
+    config.database_type = "mysql"
+    config.database_host = mysqld_connect.host
+    config.database_username = mysqld_connect.username
+    config.database_password = mysqld_connect.password
+    config.database_port = mysqld_connect.port
+    config.database_name = 'test'
+    config.database_table = 'pyway'
+    config.database_migration_dir = os.path.join('tests', 'data', 'schema')
+    config.database_pool_size = 2
+
+    with session(config) as db:
+        output = Migrate(config, db).run()
+        assert strip_ansi(output) == MIGRATE_OUTPUT
+        # Table creation, history read, 3 migrations and 3 history inserts all come from the pool
+        assert db.connections_opened <= 2
+        assert db.connections_opened + db.connections_reused == 8
+
+
+@pytest.mark.migrate_test
+@pytest.mark.mysqld_test
+def test_pooled_connections_closed(monkeypatch) -> None:
+    """ Pooled connections are counted by server thread id and closed for good with the session """
+    from pyway.dbms import mysql as mysql_dbms
+
+    class Connection():
+        def __init__(self, pool, connection_id: int) -> None:
+            self.pool = pool
+            self.connection_id = connection_id
+            self.connected = True
+
+        def close(self) -> None:
+            self.pool.idle.append(self)
+
+        def disconnect(self) -> None:
+            self.connected = False
+
+    class Pool():
+        def __init__(self, pool_size: int, **kwargs) -> None:
+            self.connections = [Connection(self, connection_id) for connection_id in range(pool_size)]
+            self.idle = list(self.connections)
+
+        def get_connection(self) -> Connection:
+            if not self.idle:
+                raise mysql.connector.errors.PoolError("Failed getting connection; pool exhausted")
+            return self.idle.pop(0)
+
+    monkeypatch.setattr(mysql_dbms, 'MySQLConnectionPool', Pool)
+    config = ConfigFile(database_type='mysql', database_table='pyway', database_pool_size='2')
+
+    with session(config) as db:
+        for _ in range(3):
+            db.connect().close()
+        assert (db.connections_opened, db.connections_reused) == (2, 1)
+        connections = db._pool.connections
+
+    assert not any(connection.connected for connection in connections)
+
+
+@pytest.mark.migrate_test
+@pytest.mark.mysqld_test
+@pytest.mark.parametrize("driver", ["cext", "pure"])
+def test_pyway_migrate_driver(mysqld_connect: Mysqld, driver: str) -> None:
+    config = ConfigFile()
+    config.database_type = "mysql"
+    config.database_host = mysqld_connect.host
+    config.database_username = mysqld_connect.username
+    config.database_password = mysqld_connect.password
+    config.database_port = mysqld_connect.port
+    config.database_name = 'test'
+    config.database_table = 'pyway'
+    config.database_migration_dir = os.path.join('tests', 'data', 'schema')
+    config.database_driver = driver
+
+    with session(config) as db:
+        output = Migrate(config, db).run()
+        assert strip_ansi(output) == MIGRATE_OUTPUT
+
+        cnx = db.connect()
+        if driver == "cext" and mysql.connector.HAVE_CEXT:
+            from mysql.connector.connection_cext import CMySQLConnection
+            assert isinstance(cnx, CMySQLConnection)
+        else:
+            assert isinstance(cnx, MySQLConnection)
+        cnx.close()
+
+
+@pytest.mark.migrate_test
+@pytest.mark.mysqld_test
+def test_pyway_migrate_unknown_driver() -> None:
+    config = ConfigFile()
+    config.database_type = "mysql"
+    config.database_table = 'pyway'
+    config.database_driver = 'odbc'
+
+    with pytest.raises(ValueError) as e:
+        with session(config):
+            pass
+
+    assert bool("unknown database driver (odbc)" in str(e.value))
@@ -213,3 +213,30 @@ def test_pyway_table_validate_outofdate(mysqld_connect: Mysqld) -> None:
         _ = Validate(config).run()
 
     assert bool("Out of date" in str(e.value))
+
+
+@pytest.mark.validate_test
+@pytest.mark.mysqld_test
+@pytest.mark.parametrize("column", ["Seconds_Behind_Source", "Seconds_Behind_Master"])
+def test_replication_lag_column(column: str) -> None:
+    """ MariaDB names the lag column Seconds_Behind_Master also with SHOW REPLICA STATUS """
+    from pyway.dbms.mysql import Mysql
+
+    class Cursor():
+        description = [("Replica_IO_State",), (column,)]
+
+        def execute(self, statement: str) -> None:
+            pass
+
+        def fetchone(self) -> tuple:
+            return ("Waiting for source", 3)
+
+        def close(self) -> None:
+            pass
+
+    class Connection():
+        def cursor(self, **kwargs) -> Cursor:
+            return Cursor()
+
+    config = ConfigFile(database_type='mysql', database_table='pyway')
+    assert Mysql(config, Connection()).replication_lag() == 3.0
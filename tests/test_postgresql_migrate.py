@@ -2,7 +2,9 @@ import pytest
 import os
 from strip_ansi import strip_ansi
 from pyway.migrate import Migrate
+from pyway.validate import Validate
 from pyway.settings import ConfigFile
+from pyway.dbms.database import session
 
 from postgresql_integration_test import PostgreSQL
 
@@ -82,3 +84,47 @@ def test_pyway_migrate_no_local_files(postgresql_connect: PostgreSQL) -> None:
         _ = Migrate(config).run()
 
     assert bool("no local migration files found" in str(e.value))
+
+
+@pytest.mark.migrate_test
+@pytest.mark.postgresql_test
+def test_pyway_migrate_single_session(postgresql_connect: PostgreSQL) -> None:
+    config = ConfigFile()
+    config.database_type = "postgres"
+    config.database_host = postgresql_connect.host
+    config.database_username = postgresql_connect.username
+    config.database_port = postgresql_connect.port
+    config.database_name = 'test'
+    config.database_table = 'public.pyway'
+    config.database_migration_dir = os.path.join('tests', 'data', 'schema-postgres')
+
+    with session(config) as db:
+        connection = db.connect()
+        output = Migrate(config, db).run()
+        assert strip_ansi(output) == MIGRATE_OUTPUT
+        # Migrations and history writes all went through the same connection
+        assert db.connect() is connection
+
+    assert connection.closed
+
+
+@pytest.mark.migrate_test
+@pytest.mark.postgresql_test
+def test_pyway_migrate_psycopg(postgresql_connect: PostgreSQL) -> None:
+    config = ConfigFile()
+    config.database_type = "psycopg"
+    config.database_host = postgresql_connect.host
+    config.database_username = postgresql_connect.username
+    config.database_port = postgresql_connect.port
+    config.database_name = 'test'
+    config.database_table = 'public.pyway'
+    config.database_migration_dir = os.path.join('tests', 'data', 'schema-postgres')
+
+    with session(config) as db:
+        output = Migrate(config, db).run()
+        assert strip_ansi(output) == MIGRATE_OUTPUT
+
+        # History written through the pipeline reads back through the binary protocol
+        output = Validate(config, db).run()
+        assert "V01_03__test3.sql VALID" in strip_ansi(output)
+        assert strip_ansi(Migrate(config, db).run()) == MIGRATE_OUTPUT_NOTHING
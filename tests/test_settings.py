@@ -8,6 +8,14 @@ from pyway.configfile import MockConfig
 from pyway.configfile import MockArgs
 
 
+@pytest.fixture(autouse=True)
+def clean_environment(monkeypatch) -> None:
+    # Environment variables take priority over the settings under test
+    for name in list(os.environ):
+        if name.startswith('PYWAY_'):
+            monkeypatch.delenv(name)
+
+
 # Make sure config options exists and check some defaults
 @pytest.mark.settings_test
 def test_settings_database_migration_dir() -> None:
@@ -135,9 +143,9 @@ def test_parse_arguments() -> None:
 
 
 @pytest.mark.settings_test
-def test_env_var_interpolation() -> None:
+def test_env_var_interpolation(monkeypatch) -> None:
     # Set an env var
-    os.environ['TEST_VAR'] = 'sometest'
+    monkeypatch.setenv('TEST_VAR', 'sometest')
 
     config = ConfigFile()
     config.config = 'tests/data/pyway_variable.conf'
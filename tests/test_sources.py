@@ -0,0 +1,114 @@
+import pytest
+import os
+import threading
+
+from pyway.catalog import load_migrations
+from pyway.helpers import Utils
+from pyway.settings import ConfigFile
+from pyway.sources import MigrationSources, split_setting
+
+
+def write(path, content: str = "SELECT 1;") -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content)
+
+
+@pytest.fixture
+def locations(tmp_path):
+    write(tmp_path / 'core' / 'V01_01__create.sql', "CREATE TABLE core (id INTEGER);")
+    write(tmp_path / 'core' / '2024' / 'V01_03__alter.sql', "ALTER TABLE core ADD COLUMN name TEXT;")
+    write(tmp_path / 'core' / 'drafts' / 'V09_01__draft.sql')
+    write(tmp_path / 'billing' / 'V01_02__create.sql', "CREATE TABLE billing (id INTEGER);")
+    write(tmp_path / 'billing' / '2025' / 'V01_04__insert.sql', "INSERT INTO billing VALUES (1);")
+    write(tmp_path / 'billing' / '2025' / 'notes.txt', "not a migration")
+    return [str(tmp_path / 'core'), str(tmp_path / 'billing')]
+
+
+@pytest.mark.helpers_test
+def test_split_setting() -> None:
+    assert split_setting("migrations, more/migrations") == ["migrations", "more/migrations"]
+    assert split_setting(["migrations", "more"]) == ["migrations", "more"]
+    assert split_setting(None) == []
+
+
+@pytest.mark.helpers_test
+def test_flat_locations(locations) -> None:
+    migrations = load_migrations(MigrationSources(locations))
+    # Subdirectories are only searched when recursive
+    assert [m.name for m in migrations] == ['V01_01__create.sql', 'V01_02__create.sql']
+    assert [m.path for m in migrations] == locations
+
+
+@pytest.mark.helpers_test
+def test_recursive_locations(locations) -> None:
+    sources = MigrationSources(locations, recursive=True, include=["*.sql"], exclude=["drafts"])
+    migrations = load_migrations(sources)
+
+    assert [m.version for m in migrations] == ['01.01', '01.02', '01.03', '01.04']
+    assert migrations[2].path == os.path.join(locations[0], '2024')
+    assert migrations[3].checksum == Utils.load_checksum_from_name('V01_04__insert.sql',
+                                                                   os.path.join(locations[1], '2025'))
+
+
+@pytest.mark.helpers_test
+def test_include_patterns(locations) -> None:
+    sources = MigrationSources(locations, recursive=True, include=["2024/*", "2025/*.sql"])
+    assert [m.name for m in load_migrations(sources)] == ['V01_03__alter.sql', 'V01_04__insert.sql']
+
+
+@pytest.mark.helpers_test
+def test_duplicate_versions(locations, tmp_path) -> None:
+    write(tmp_path / 'billing' / 'V1_1__again.sql')
+
+    with pytest.raises(RuntimeError) as e:
+        load_migrations(MigrationSources(locations))
+    assert "migration version 1.1 found twice" in str(e.value)
+    assert "V01_01__create.sql" in str(e.value) and "V1_1__again.sql" in str(e.value)
+
+
+@pytest.mark.helpers_test
+def test_locations_scanned_concurrently(locations, monkeypatch) -> None:
+    threads = []
+    scan_location = MigrationSources.scan_location
+
+    def recording_scan(self, location):
+        threads.append(threading.current_thread().name)
+        return scan_location(self, location)
+
+    monkeypatch.setattr(MigrationSources, 'scan_location', recording_scan)
+    load_migrations(MigrationSources(locations))
+    assert len(threads) == 2
+    assert all(thread.startswith("pyway-scan") for thread in threads)
+
+
+@pytest.mark.helpers_test
+def test_missing_location(locations, tmp_path) -> None:
+    with pytest.raises(FileNotFoundError):
+        load_migrations(MigrationSources(locations + [str(tmp_path / 'missing')]))
+
+
+@pytest.mark.migrate_test
+@pytest.mark.sqlite_test
+def test_migrate_locations(locations, tmp_path) -> None:
+    from pyway.dbms.database import session
+    from pyway.info import Info
+    from pyway.migrate import Migrate
+    from pyway.validate import Validate
+
+    config = ConfigFile(database_migration_recursive="true", database_migration_include="*.sql,*.py",
+                        database_migration_exclude="drafts", checksum_cache="true")
+    config.database_type = "sqlite"
+    config.database_name = str(tmp_path / 'locations.sqlite')
+    config.database_table = 'pyway'
+    config.database_migration_dir = ",".join(locations)
+
+    with session(config) as db:
+        output = Migrate(config, db).run()
+        assert "V01_04__insert.sql SUCCESS" in output
+        assert db.get_all_schema_migrations()[-1].name == 'V01_04__insert.sql'
+
+    with session(config) as db:
+        assert "V01_03__alter.sql VALID" in Validate(config, db).run()
+        assert "V01_04__insert.sql" in Info(config, db).run()
+    # Every directory keeps its own checksum cache
+    assert os.path.exists(os.path.join(locations[1], '2025', '.pyway-cache'))
@@ -98,3 +98,53 @@ def test_pyway_table_checksum_invalid_filename(sqlite_connect) -> None:
         _, _ = Checksum(config).run()
 
     assert True
+
+
+@pytest.mark.checksum_test
+@pytest.mark.sqlite_test
+def test_pyway_table_checksum_all(sqlite_connect, tmp_path) -> None:
+    from pyway.validate import Validate
+
+    for version in (1, 2):
+        (tmp_path / f'V01_0{version}__step.sql').write_text(f"CREATE TABLE step{version} (id INTEGER);")
+    config = ConfigFile()
+    config.database_type = "sqlite"
+    config.database_name = "./unittest-checksum.sqlite"
+    config.database_table = 'pyway'
+    config.database_migration_dir = str(tmp_path)
+    _ = Migrate(config).run()
+
+    # New migrations use the configured algorithm, earlier CRC32 rows still validate
+    (tmp_path / 'V01_03__step.sql').write_text("CREATE TABLE step3 (id INTEGER);")
+    config.checksum_algorithm = "blake2b"
+    _ = Migrate(config).run()
+    checksums = [m.checksum for m in sqlite_connect.get_all_schema_migrations()]
+    assert [checksum.startswith("b2:") for checksum in checksums] == [False, False, True]
+    assert "V01_03__step.sql VALID" in Validate(config).run()
+
+    config.checksum_all = True
+    updated = Checksum(config).run_all()
+    assert [name for name, _ in updated] == ['V01_01__step.sql', 'V01_02__step.sql']
+    assert all(m.checksum.startswith("b2:") for m in sqlite_connect.get_all_schema_migrations())
+    assert "V01_01__step.sql VALID" in Validate(config).run()
+    assert Checksum(config).run_all() == []
+
+
+@pytest.mark.checksum_test
+@pytest.mark.sqlite_test
+def test_pyway_table_checksum_all_changed_file(sqlite_connect, tmp_path) -> None:
+    (tmp_path / 'V01_01__step.sql').write_text("CREATE TABLE step1 (id INTEGER);")
+    config = ConfigFile()
+    config.database_type = "sqlite"
+    config.database_name = "./unittest-checksum.sqlite"
+    config.database_table = 'pyway'
+    config.database_migration_dir = str(tmp_path)
+    _ = Migrate(config).run()
+    before = sqlite_connect.get_all_schema_migrations()[0].checksum
+
+    (tmp_path / 'V01_01__step.sql').write_text("CREATE TABLE step1 (id BIGINT);")
+    config.checksum_algorithm = "sha256"
+    # The edited file must not be recorded under the new algorithm
+    with pytest.raises(RuntimeError):
+        Checksum(config).run_all()
+    assert sqlite_connect.get_all_schema_migrations()[0].checksum == before
@@ -1,10 +1,16 @@
 import pytest
 import os
+import glob
+import shutil
+import sqlite3
 from strip_ansi import strip_ansi
 from pyway.migrate import Migrate
+from pyway.validate import Validate
+from pyway.migration import Migration
+from pyway.plan import Plan
 from pyway.settings import ConfigFile
 
-from pyway.dbms.database import factory
+from pyway.dbms.database import factory, session
 
 MIGRATE_OUTPUT = """Migrating --> V01_01__test1.sql
 V01_01__test1.sql SUCCESS
@@ -85,3 +91,128 @@ def test_pyway_migrate_no_local_files(sqlite_connect) -> None:
         _ = Migrate(config).run()
 
     assert bool("no local migration files found" in str(e.value))
+
+
+@pytest.mark.migrate_test
+@pytest.mark.sqlite_test
+def test_pyway_migrate_bulk_mode(sqlite_connect, tmp_path) -> None:
+    for sql_file in glob.glob(os.path.join('tests', 'data', 'schema-sqlite', '*.sql')):
+        shutil.copy(sql_file, tmp_path)
+
+    config = ConfigFile()
+    config.database_type = "sqlite"
+    config.database_name = './unittest-migrate.sqlite'
+    config.database_table = 'pyway'
+    config.database_migration_dir = str(tmp_path)
+    config.database_bulk_mode = True
+
+    with session(config) as db:
+        # Only a migrate run switches the pragmas, reading the history leaves them alone
+        connection = db.connect()
+        assert connection.execute("PRAGMA journal_mode").fetchone()[0] == "delete"
+        output = Migrate(config, db).run()
+        assert strip_ansi(output) == MIGRATE_OUTPUT
+        assert connection.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        # The same connection served the whole run
+        assert db.connect() is connection
+
+    # The original journal mode is restored once the run is over
+    cnx = sqlite3.connect('./unittest-migrate.sqlite')
+    assert cnx.execute("PRAGMA journal_mode").fetchone()[0] == "delete"
+    assert len(cnx.execute("SELECT version FROM pyway").fetchall()) == 4
+    cnx.close()
+
+
+@pytest.mark.migrate_test
+@pytest.mark.sqlite_test
+def test_pyway_migrate_atomic(tmp_path) -> None:
+    database_name = './unittest-migrate-atomic.sqlite'
+    try:
+        os.remove(database_name)
+    except Exception:
+        pass
+
+    with open(tmp_path / 'V01_01__test1.sql', 'w') as f:
+        f.write("CREATE TABLE testtable (id INTEGER PRIMARY KEY);\n")
+    with open(tmp_path / 'V01_02__test2.sql', 'w') as f:
+        f.write("CREATE TABLE othertable (id INTEGER);\nINSERT INTO missingtable VALUES (1);\n")
+
+    config = ConfigFile()
+    config.database_type = "sqlite"
+    config.database_name = database_name
+    config.database_table = 'pyway'
+    config.database_migration_dir = str(tmp_path)
+    config.atomic_mode = True
+
+    with pytest.raises(RuntimeError):
+        Migrate(config).run()
+
+    # The failed migration left neither its schema changes nor a history row behind
+    cnx = sqlite3.connect(database_name)
+    tables = [row[0] for row in cnx.execute("SELECT name FROM sqlite_master WHERE type='table'").fetchall()]
+    assert 'testtable' in tables
+    assert 'othertable' not in tables
+    assert [row[0] for row in cnx.execute("SELECT name FROM pyway").fetchall()] == ['V01_01__test1.sql']
+    cnx.close()
+
+
+@pytest.mark.migrate_test
+@pytest.mark.sqlite_test
+@pytest.mark.parametrize("atomic", [True, False])
+def test_pyway_migrate_history_table_dropped(tmp_path, atomic) -> None:
+    migration_dir = tmp_path / 'migrations'
+    migration_dir.mkdir()
+    with open(migration_dir / 'V01_01__test1.sql', 'w') as f:
+        f.write("CREATE TABLE testtable (id INTEGER PRIMARY KEY);\n")
+
+    config = ConfigFile()
+    config.database_type = "sqlite"
+    config.database_name = str(tmp_path / 'dropped.sqlite')
+    config.database_table = 'pyway'
+    config.database_migration_dir = str(migration_dir)
+    config.atomic_mode = atomic
+
+    with session(config) as db:
+        db.create_version_table_if_not_exists()
+        # Dropped after this process ensured it
+        db.execute("DROP TABLE pyway")
+        assert "V01_01__test1.sql SUCCESS" in Migrate(config, db).run()
+
+    cnx = sqlite3.connect(config.database_name)
+    assert [row[0] for row in cnx.execute("SELECT name FROM pyway").fetchall()] == ['V01_01__test1.sql']
+    cnx.close()
+
+
+@pytest.mark.migrate_test
+@pytest.mark.sqlite_test
+def test_pyway_migrate_shared_plan(sqlite_connect, tmp_path, monkeypatch) -> None:
+    for sql_file in glob.glob(os.path.join('tests', 'data', 'schema-sqlite', '*.sql')):
+        shutil.copy(sql_file, tmp_path)
+
+    config = ConfigFile()
+    config.database_type = "sqlite"
+    config.database_name = './unittest-migrate.sqlite'
+    config.database_table = 'pyway'
+    config.database_migration_dir = str(tmp_path)
+
+    scanned = []
+    from_name = Migration.from_name
+    monkeypatch.setattr(Migration, 'from_name',
+                        lambda name, path, *args: scanned.append(name) or from_name(name, path, *args))
+
+    with session(config) as db:
+        fetched = []
+        get_all_schema_migrations = db.get_all_schema_migrations
+        monkeypatch.setattr(db, 'get_all_schema_migrations', lambda: fetched.append(1) or get_all_schema_migrations())
+
+        plan = Plan(config, db)
+        Validate(config, plan=plan).run(skip_initial_check=True)
+        output = Migrate(config, plan=plan).run()
+        assert strip_ansi(output) == MIGRATE_OUTPUT
+
+        # Validation and migration shared one directory scan and one history fetch
+        assert len(scanned) == 4
+        assert len(fetched) == 1
+
+        # The plan tracks what was applied
+        assert strip_ansi(Migrate(config, plan=plan).run()) == MIGRATE_OUTPUT_NOTHING
@@ -5,7 +5,8 @@ from pyway.validate import Validate
 from pyway.import_ import Import
 from pyway.settings import ConfigFile
 
-from pyway.dbms.database import factory
+from pyway.dbms.database import factory, read_session
+from pyway.dbms.sqlite import Sqlite
 
 VALIDATE_OUTPUT = """Validating --> V01_01__test1.sql
 V01_01__test1.sql VALID
@@ -190,3 +191,67 @@ def test_pyway_table_validate_outofdate(sqlite_connect) -> None:
         _ = Validate(config).run()
 
     assert bool("Out of date" in str(e.value))
+
+
+def replica_config() -> ConfigFile:
+    config = ConfigFile()
+    config.database_type = "sqlite"
+    config.database_name = './unittest-validate.sqlite'
+    config.database_table = 'pyway'
+    config.database_host = 'primary'
+    config.database_username = 'writer'
+    config.database_replica_host = 'replica'
+    config.database_replica_username = 'reader'
+    return config
+
+
+@pytest.mark.validate_test
+@pytest.mark.sqlite_test
+def test_read_session_uses_replica() -> None:
+    config = replica_config()
+
+    with read_session(config) as db:
+        assert db.config.database_host == 'replica'
+        assert db.config.database_username == 'reader'
+        assert db.config.read_only
+
+    # The primary's config is left alone
+    assert config.database_host == 'primary'
+
+
+@pytest.mark.validate_test
+@pytest.mark.sqlite_test
+@pytest.mark.parametrize("lag", [30.0, None])
+def test_read_session_lagging_replica_falls_back(monkeypatch, lag) -> None:
+    config = replica_config()
+    config.database_replica_max_lag = '10'
+    monkeypatch.setattr(Sqlite, 'replication_lag', lambda self: lag)
+
+    with read_session(config) as db:
+        assert db.config.database_host == 'primary'
+
+
+@pytest.mark.validate_test
+@pytest.mark.sqlite_test
+def test_read_session_replica_within_max_lag(monkeypatch) -> None:
+    config = replica_config()
+    config.database_replica_max_lag = '10'
+    monkeypatch.setattr(Sqlite, 'replication_lag', lambda self: 2.5)
+
+    with read_session(config) as db:
+        assert db.config.database_host == 'replica'
+
+
+@pytest.mark.validate_test
+@pytest.mark.sqlite_test
+def test_read_session_unreachable_replica_falls_back(monkeypatch) -> None:
+    config = replica_config()
+    config.database_replica_max_lag = '10'
+
+    def unreachable(self):
+        raise ConnectionError("connection refused")
+
+    monkeypatch.setattr(Sqlite, 'replication_lag', unreachable)
+
+    with read_session(config) as db:
+        assert db.config.database_host == 'primary'